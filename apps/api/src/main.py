@@ -1,4 +1,18 @@
-﻿from fastapi import FastAPI
+﻿import json
+import os
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+# Make the repo's shared ``src``/``etl`` packages importable when running from a checkout
+ROOT = Path(__file__).resolve().parents[3]
+if (ROOT / "etl").is_dir() and str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from src.observability import profiler
 
 app = FastAPI(title="bank-match API", version="0.1.0")
 
@@ -9,3 +23,126 @@ def health():
 @app.get("/")
 def root():
     return {"name": "bank-match", "version": "0.1.0"}
+
+# Opt-in instrumentation: BANKMATCH_PROFILE=1 records stage timings and gate counters
+if os.environ.get("BANKMATCH_PROFILE", "").lower() in ("1", "true", "yes"):
+    profiler.enable()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of the process-wide profiler counters."""
+    prof = profiler.current()
+    return prof.render_prometheus() if prof is not None else ""
+
+
+# ---------- Batch-match jobs ----------
+# Jobs live in a SQLite file (BANKMATCH_JOBS_DB). Set BANKMATCH_JOB_WORKERS to
+# process them inside the API, or run ``python etl/jobs.py worker`` separately.
+# Workers match against BANKMATCH_SNAPSHOT and/or BANKMATCH_DSN.
+_job_store = None
+
+
+def job_store():
+    global _job_store
+    if _job_store is None:
+        from etl.jobs import JobStore
+
+        _job_store = JobStore(os.environ.get("BANKMATCH_JOBS_DB", "jobs.db"))
+    return _job_store
+
+
+@app.on_event("startup")
+def start_job_workers():
+    count = int(os.environ.get("BANKMATCH_JOB_WORKERS", "0"))
+    if count > 0:
+        from etl.jobs import start_worker_threads
+
+        start_worker_threads(
+            job_store(), count,
+            os.environ.get("BANKMATCH_DSN"), os.environ.get("BANKMATCH_SNAPSHOT"),
+        )
+
+
+def _parse_job_body(body: bytes, content_type: str):
+    from etl.jobs import parse_customers_csv, parse_customers_ndjson
+
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        return parse_customers_csv(text), {}
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return parse_customers_ndjson(text), {}
+    try:
+        payload = json.loads(text or "{}")
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON body: {exc}")
+    if not isinstance(payload, dict):
+        raise ValueError("JSON body must be an object")
+    if "customer_ids" in payload:
+        customers = [{"customer_id": int(i)} for i in payload["customer_ids"]]
+    else:
+        customers = payload.get("customers") or []
+    if not isinstance(customers, list) or not all(isinstance(c, dict) for c in customers):
+        raise ValueError("customers must be a list of objects")
+    return customers, payload
+
+
+@app.post("/jobs/match", status_code=202)
+async def submit_match_job(request: Request, top: int = 5, chunk_size: int = 500):
+    """Queue a batch match.
+
+    Body is JSON ``{"customer_ids": [...]}`` / ``{"customers": [...]}``, or a
+    ``text/csv`` / ``application/x-ndjson`` upload of customer profiles.
+    """
+    from etl.streaming import normalize_customer
+
+    body = await request.body()
+    try:
+        customers, options = _parse_job_body(body, request.headers.get("content-type", ""))
+        customers = [normalize_customer(c) for c in customers]
+        for row, customer in enumerate(customers):
+            customer.setdefault("row", row)
+        top = int(options.get("top", top))
+        chunk_size = int(options.get("chunk_size", chunk_size))
+        if top < 1 or chunk_size < 1:
+            raise ValueError("top and chunk_size must be positive")
+        job_id = await run_in_threadpool(job_store().submit, customers, top, chunk_size)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {
+        "id": job_id,
+        "customers": len(customers),
+        "status_url": f"/jobs/{job_id}",
+        "results_url": f"/jobs/{job_id}/results",
+    }
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    status = job_store().status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@app.get("/jobs/{job_id}/results")
+def job_results(job_id: str, partial: bool = False, format: str = "ndjson"):
+    """Stream results in submission order.
+
+    ``ndjson`` gives one line per customer with its matches; ``csv`` one row
+    per (customer, product). Unfinished jobs return 409 unless
+    ``partial=true``, which streams the chunks completed so far.
+    """
+    from etl.streaming import MEDIA_TYPES, ROW_FIELDS, iter_csv, rows_from_ndjson
+
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    store = job_store()
+    status = store.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if status["status"] != "done" and not partial:
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    lines = store.iter_results(job_id)
+    body = lines if format == "ndjson" else iter_csv(rows_from_ndjson(lines), ROW_FIELDS)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format])
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""Benchmark suite for matching, rules, features, conversion and ingest.
+
+Runs against an in-memory synthetic catalog by default. Passing ``--dsn``
+additionally benchmarks ``ingest_csv`` and ``match_products`` against a
+*disposable* Postgres database: its tables are created from
+``db/migrations`` and truncated before loading.
+
+Results are written as JSON so runs can be compared across commits:
+
+    python -m benchmarks.run --preset quick --output bench_base.json
+    git checkout my-branch
+    python -m benchmarks.run --preset quick --output bench_new.json \
+        --compare bench_base.json
+
+``--compare`` exits non-zero when any benchmark is slower than the baseline by
+more than ``--tolerance``. The suite also times a cold import of each ETL
+entry point with ``python -X importtime`` and exits non-zero when one exceeds
+its budget in :data:`IMPORT_BUDGETS_MS` or loads a heavy dependency
+(:data:`HEAVY_MODULES`) at import time.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from benchmarks import synthetic
+from etl.convert_json_to_csv import convert_json_to_csv
+from etl.match_customer import rank_products
+from src.features.financial_features import avg_daily_balance, dscr, month_over_month_growth
+from src.scoring.rules_engine import Rule, RulesEngine
+
+# ``match_customers`` are matched (best of ``--repeat``) by every matching path
+# at every catalog size; ``bulk_customers`` are streamed once through the
+# snapshot ranker against the smallest catalog to cover portfolio-sized runs.
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "smoke": {"products": [200], "customers": 1000, "match_customers": 10, "bulk_customers": 0},
+    "quick": {"products": [1000, 10000], "customers": 100000, "match_customers": 50,
+              "bulk_customers": 0},
+    "full": {"products": [1000, 10000, 100000], "customers": 1000000, "match_customers": 200,
+             "bulk_customers": 1000000},
+}
+
+# Cumulative cold-import budgets for the entry points, in milliseconds
+IMPORT_BUDGETS_MS: Dict[str, float] = {
+    "etl.records": 25.0,
+    "etl.match_customer": 50.0,
+    "etl.ingest_csv": 50.0,
+    "etl.streaming": 50.0,
+    "etl.jobs": 75.0,
+}
+
+# Dependencies the entry points may only load on the code paths that need them
+HEAVY_MODULES = ("numpy", "pandas", "psycopg2", "dateutil")
+
+MIGRATIONS = ["0001_init.sql", "0002_match_schema.sql", "0003_catalog_version.sql"]
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Return the fastest wall time of *repeat* calls to *fn*."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def record(results: List[Dict[str, Any]], name: str, params: Dict[str, Any],
+           ops: int, seconds: float) -> None:
+    results.append({
+        "name": name,
+        "params": params,
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "us_per_op": round(seconds / max(ops, 1) * 1e6, 3),
+    })
+    print(f"{name:28} {json.dumps(params):45} {seconds:10.4f}s {results[-1]['us_per_op']:12.3f} us/op",
+          file=sys.stderr)
+
+
+def measure_import(module: str) -> Tuple[float, List[str]]:
+    """Cold-import *module* in a fresh interpreter.
+
+    Returns the cumulative import time in seconds from ``-X importtime`` and
+    the :data:`HEAVY_MODULES` it pulled in.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    seconds = 0.0
+    heavy = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if name == module:
+            seconds = int(cumulative) / 1e6
+        if name.split(".")[0] in HEAVY_MODULES:
+            heavy.add(name.split(".")[0])
+    return seconds, sorted(heavy)
+
+
+def check_imports(results, budgets: Dict[str, float], repeat: int) -> List[str]:
+    """Record cold-import times and return budget/heavy-import violations."""
+    violations = []
+    for module, budget_ms in budgets.items():
+        runs = [measure_import(module) for _ in range(repeat)]
+        seconds = min(r[0] for r in runs)
+        record(results, "startup.import", {"module": module}, 1, seconds)
+        if seconds * 1000 > budget_ms:
+            violations.append(f"{module} imports in {seconds * 1000:.1f} ms (budget {budget_ms:.0f} ms)")
+        if runs[0][1]:
+            violations.append(f"{module} imports {', '.join(runs[0][1])} at load time")
+    return violations
+
+
+def bench_features(results, customers: int, repeat: int, seed: int) -> None:
+    balances = synthetic.generate_balances(customers, seed)
+    monthly = balances[: max(len(balances) // 30, 2)]
+    params = {"values": customers}
+    record(results, "features.avg_daily_balance", params, customers,
+           best_of(lambda: avg_daily_balance(balances), repeat))
+    record(results, "features.mom_growth", {"values": len(monthly)}, len(monthly),
+           best_of(lambda: month_over_month_growth(monthly), repeat))
+    pairs = [(b, abs(b) / 1.3 + 1.0) for b in balances]
+    record(results, "features.dscr", params, customers,
+           best_of(lambda: [dscr(e, d) for e, d in pairs], repeat))
+
+
+def bench_rules(results, customers: List[Dict[str, Any]], repeat: int) -> None:
+    engine = RulesEngine([
+        Rule("personal_credit_score", ">=", 660, hard=True),
+        Rule("dscr", ">=", 1.15, weight=50, hard=False),
+        Rule("years_in_business", ">=", 2, weight=50, hard=False),
+    ])
+    record(results, "rules_engine.evaluate", {"customers": len(customers)}, len(customers),
+           best_of(lambda: [engine.evaluate(c) for c in customers], repeat))
+
+
+def bench_matching(results, products: List[Dict[str, Any]],
+                   customers: List[Dict[str, Any]], repeat: int) -> None:
+    from etl.catalog import ColumnarCatalog
+    from etl.near_miss import evaluate_gates
+
+    by_type: Dict[str, List[Dict[str, Any]]] = {}
+    for p in products:
+        by_type.setdefault(p["product_type"], []).append(p)
+    params = {"products": len(products), "customers": len(customers)}
+
+    def rank_all():
+        for c in customers:
+            rank_products(by_type.get(c["requested_product_type"], []), c, 10)
+
+    record(results, "match.rank_products", params, len(customers), best_of(rank_all, repeat))
+
+    from etl.records import CustomerProfile, ProductCriteria
+
+    records = {t: [ProductCriteria(**p) for p in ps] for t, ps in by_type.items()}
+    profiles = [CustomerProfile(**c) for c in customers]
+
+    def rank_records():
+        for c in profiles:
+            rank_products(records.get(c.requested_product_type, []), c, 10)
+
+    record(results, "match.rank_records", params, len(customers), best_of(rank_records, repeat))
+
+    catalogs = {t: ColumnarCatalog.from_products(ps) for t, ps in by_type.items()}
+    record(results, "match.columnar_build", {"products": len(products)}, len(products),
+           best_of(lambda: [ColumnarCatalog.from_products(ps) for ps in by_type.values()], repeat))
+
+    def gates_all():
+        for c in customers:
+            catalog = catalogs.get(c["requested_product_type"])
+            if catalog is not None:
+                evaluate_gates(catalog, c)
+
+    record(results, "match.near_miss_gates", params, len(customers), best_of(gates_all, repeat))
+
+
+def bench_snapshot(results, products: List[Dict[str, Any]], customers: List[Dict[str, Any]],
+                   repeat: int, workdir: Path) -> None:
+    from etl.snapshot import open_snapshot, rank_catalog, write_snapshot
+
+    path = str(workdir / f"catalog_{len(products)}.snap")
+    record(results, "snapshot.write", {"products": len(products)}, len(products),
+           best_of(lambda: write_snapshot(products, path), repeat))
+    record(results, "snapshot.open", {"products": len(products)}, 1,
+           best_of(lambda: open_snapshot(path).close(), repeat))
+
+    snap = open_snapshot(path)
+
+    def rank_all():
+        for c in customers:
+            rank_catalog(snap.catalog(c["requested_product_type"]), c, 10)
+
+    record(results, "match.rank_snapshot", {"products": len(products), "customers": len(customers)},
+           len(customers), best_of(rank_all, repeat))
+    snap.close()
+
+
+def bench_bulk_match(results, products: List[Dict[str, Any]], customers: List[Dict[str, Any]],
+                     workdir: Path) -> None:
+    """Stream every customer through the snapshot ranker once (no repeats)."""
+    from etl.snapshot import open_snapshot, rank_catalog, write_snapshot
+    from etl.streaming import stream_matches
+
+    path = str(workdir / f"bulk_{len(products)}.snap")
+    write_snapshot(products, path)
+    snap = open_snapshot(path)
+    start = time.perf_counter()
+    rows = sum(1 for _ in stream_matches(
+        customers, lambda c: rank_catalog(snap.catalog(c["requested_product_type"]), c, 10)))
+    elapsed = time.perf_counter() - start
+    snap.close()
+    record(results, "match.bulk_snapshot",
+           {"products": len(products), "customers": len(customers), "rows": rows},
+           len(customers), elapsed)
+
+
+def bench_convert(results, products, banks, repeat: int, workdir: Path) -> Path:
+    records = synthetic.generate_research_records(products, banks)
+    src = workdir / f"research_{len(products)}.json"
+    src.write_text(json.dumps(records), encoding="utf-8")
+    out = workdir / f"research_{len(products)}.csv"
+    record(results, "convert_json_to_csv", {"products": len(products)}, len(products),
+           best_of(lambda: convert_json_to_csv(str(src), str(out)), repeat))
+    return out
+
+
+def prepare_database(conn) -> None:
+    """Create the schema and empty every table of a disposable database."""
+    cur = conn.cursor()
+    for name in MIGRATIONS:
+        cur.execute((ROOT / "db" / "migrations" / name).read_text(encoding="utf-8"))
+    cur.execute("TRUNCATE banks, customer_profiles RESTART IDENTITY CASCADE")
+    conn.commit()
+    cur.close()
+
+
+# Criteria tables filled from the synthetic products (column -> product key);
+# ingest_csv only loads the ``products`` table.
+CRITERIA_TABLES: Dict[str, Dict[str, str]] = {
+    "product_eligibility": {c: c for c in (
+        "allowed_entities", "allowed_industries", "excluded_industries", "geographic_footprint",
+        "excluded_states", "min_years_in_business", "min_annual_revenue_usd",
+        "requires_existing_relationship")},
+    "product_underwriting": {c: c for c in (
+        "min_personal_credit_score", "min_business_credit_score", "min_dscr", "min_current_ratio",
+        "max_debt_to_equity", "cashflow_positive_required", "negative_balance_days_avg",
+        "negative_balance_longest_streak", "negative_balance_max_overdraft_usd")},
+    "product_collateral": dict({c: c for c in (
+        "collateral_required", "eligible_collateral_types", "max_ltv_real_estate",
+        "max_ltv_equipment", "max_ltv_receivables", "max_ltv_inventory", "personal_guarantee",
+        "guarantee_type", "decision_timeline_prequal_days", "decision_timeline_underwriting_days",
+        "average_time_to_fund_days", "special_conditions")}, purpose_allowed="deal_purpose_allowed"),
+}
+
+
+def load_criteria(conn, products: List[Dict[str, Any]]) -> None:
+    """Insert the eligibility/underwriting/collateral rows of ingested *products*."""
+    from psycopg2.extras import execute_values
+
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM products ORDER BY id")
+    ids = [row[0] for row in cur.fetchall()]
+    if len(ids) != len(products):
+        raise RuntimeError(f"Expected {len(products)} ingested products, found {len(ids)}")
+    for table, columns in CRITERIA_TABLES.items():
+        execute_values(
+            cur,
+            f"INSERT INTO {table} (product_id, {', '.join(columns)}) VALUES %s",
+            [(pid, *(p[key] for key in columns.values())) for pid, p in zip(ids, products)],
+            page_size=1000,
+        )
+    conn.commit()
+    cur.close()
+
+
+def bench_database(results, dsn: str, csv_path: Path, products: List[Dict[str, Any]],
+                   customers: List[Dict[str, Any]]) -> None:
+    import psycopg2
+
+    from etl.ingest_csv import main as ingest_main
+    from etl.match_customer import match_products
+
+    conn = psycopg2.connect(dsn)
+    prepare_database(conn)
+    # ingest appends products, so it is timed once on an empty database; its
+    # progress messages go to stderr to keep a stdout JSON report parseable
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        ingest_main(["--dsn", dsn, "--csv", str(csv_path)])
+    record(results, "ingest_csv", {"products": len(products)}, len(products),
+           time.perf_counter() - start)
+
+    # Match against the same criteria as the in-memory benchmarks
+    load_criteria(conn, products)
+    start = time.perf_counter()
+    for c in customers:
+        match_products(conn, c, 10)
+    record(results, "match.match_products_db", {"products": len(products), "customers": len(customers)},
+           len(customers), time.perf_counter() - start)
+    conn.close()
+
+
+def run_suite(products_scales: List[int], customers: int, match_customers: int,
+              repeat: int = 3, seed: int = 0, dsn: Optional[str] = None,
+              bulk_customers: int = 0) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    import_violations = check_imports(results, IMPORT_BUDGETS_MS, repeat)
+    population = synthetic.generate_customers(customers, seed)
+    bench_features(results, customers, repeat, seed)
+    bench_rules(results, population, repeat)
+    sample = population[:match_customers]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in products_scales:
+            banks = synthetic.generate_banks(max(n // 8, 1), seed)
+            products = synthetic.generate_products(n, seed, banks)
+            bench_matching(results, products, sample, repeat)
+            bench_snapshot(results, products, sample, repeat, Path(tmp))
+            if bulk_customers and n == min(products_scales):
+                bulk = population if bulk_customers == len(population) \
+                    else synthetic.generate_customers(bulk_customers, seed)
+                bench_bulk_match(results, products, bulk, Path(tmp))
+            csv_path = bench_convert(results, products, banks, repeat, Path(tmp))
+            if dsn:
+                bench_database(results, dsn, csv_path, products, sample)
+    return {"meta": run_metadata(seed, repeat), "results": results, "import_violations": import_violations}
+
+
+def run_metadata(seed: int, repeat: int) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def _result_key(r: Dict[str, Any]) -> str:
+    return f"{r['name']} {json.dumps(r['params'], sort_keys=True)}"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return descriptions of benchmarks slower than *baseline* beyond *tolerance*."""
+    base = {_result_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        old = base.get(_result_key(r))
+        if not old or not old["us_per_op"]:
+            continue
+        ratio = r["us_per_op"] / old["us_per_op"]
+        line = f"{_result_key(r):75} {old['us_per_op']:12.3f} -> {r['us_per_op']:12.3f} us/op ({ratio:.2f}x)"
+        print(line, file=sys.stderr)
+        if ratio > 1 + tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Run bank-match benchmarks")
+    ap.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    ap.add_argument("--products", type=_int_list, help="Comma-separated catalog sizes")
+    ap.add_argument("--customers", type=int, help="Customers for rules/feature benchmarks")
+    ap.add_argument("--match-customers", type=int, help="Customers matched against each catalog")
+    ap.add_argument("--bulk-customers", type=int,
+                    help="Customers streamed once through the snapshot ranker (0 disables)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--dsn", help="DSN of a DISPOSABLE Postgres database (tables are truncated)")
+    ap.add_argument("--output", help="Write JSON results to this path (default: stdout)")
+    ap.add_argument("--compare", help="Baseline JSON results to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    args = ap.parse_args(argv)
+
+    preset = PRESETS[args.preset]
+    report = run_suite(
+        args.products or preset["products"],
+        args.customers or preset["customers"],
+        args.match_customers or preset["match_customers"],
+        repeat=args.repeat,
+        seed=args.seed,
+        dsn=args.dsn,
+        bulk_customers=preset["bulk_customers"] if args.bulk_customers is None else args.bulk_customers,
+    )
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+    for violation in report["import_violations"]:
+        print(f"startup: {violation}", file=sys.stderr)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            raise SystemExit(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+    if report["import_violations"]:
+        raise SystemExit(f"{len(report['import_violations'])} entry point(s) over the startup budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Seeded synthetic data for benchmarks.
+
+Generates banks, products (with eligibility, underwriting and collateral
+criteria), research JSON records and customer profiles with roughly realistic
+distributions: states weighted by small-business population, a skewed
+industry mix, FICO scores around 700 and product cutoffs on the usual
+20-point steps. The same seed always yields the same data.
+
+Products are returned as the product row dicts the matching functions accept
+(the columns of ``etl.records``), so they need no database.
+"""
+from __future__ import annotations
+
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# (state, relative weight) — rough share of US small businesses
+STATES: List[Tuple[str, float]] = [
+    ("CA", 12.0), ("TX", 9.0), ("FL", 8.5), ("NY", 6.5), ("IL", 3.8),
+    ("PA", 3.8), ("GA", 3.6), ("OH", 3.0), ("NC", 3.0), ("MI", 2.8),
+    ("NJ", 2.8), ("VA", 2.4), ("WA", 2.2), ("AZ", 2.0), ("MA", 2.0),
+    ("CO", 2.0), ("TN", 1.9), ("MD", 1.6), ("MN", 1.6), ("IN", 1.6),
+    ("MO", 1.6), ("WI", 1.4), ("SC", 1.4), ("AL", 1.2), ("LA", 1.2),
+    ("OR", 1.2), ("UT", 1.1), ("KY", 1.1), ("NV", 1.0), ("OK", 1.0),
+]
+
+INDUSTRIES: List[Tuple[str, float]] = [
+    ("Professional Services", 14.0), ("Construction", 12.0), ("Retail", 11.0),
+    ("Restaurants", 10.0), ("Healthcare", 9.0), ("Real Estate", 7.0),
+    ("Transportation", 6.0), ("Manufacturing", 6.0), ("Wholesale", 5.0),
+    ("Technology", 5.0), ("Agriculture", 3.0), ("Hospitality", 3.0),
+    ("Automotive", 3.0), ("Education", 2.0), ("Cannabis", 1.0),
+    ("Gambling", 0.5), ("Adult", 0.5),
+]
+
+ENTITIES: List[Tuple[str, float]] = [
+    ("LLC", 55.0), ("S-Corp", 20.0), ("C-Corp", 10.0),
+    ("Sole Proprietorship", 12.0), ("Partnership", 3.0),
+]
+
+PRODUCT_TYPES: List[Tuple[str, float]] = [
+    ("term_loan", 40.0), ("line_of_credit", 30.0), ("sba_7a", 15.0),
+    ("equipment", 10.0), ("cre", 5.0),
+]
+
+PURPOSES: List[str] = [
+    "WorkingCapital", "Equipment", "Expansion", "Inventory",
+    "RealEstate", "Refinance", "Acquisition",
+]
+
+HIGH_RISK_INDUSTRIES = ["Cannabis", "Gambling", "Adult"]
+FICO_CUTOFFS = [None, 600, 620, 640, 660, 680, 700, 720]
+DSCR_CUTOFFS = [None, 1.0, 1.1, 1.15, 1.2, 1.25, 1.35]
+LOAN_BANDS = [
+    (10000, 100000), (25000, 250000), (50000, 500000),
+    (100000, 1000000), (250000, 5000000),
+]
+
+
+def _weighted(rng: random.Random, table: Sequence[Tuple[Any, float]], k: int = 1) -> List[Any]:
+    values = [v for v, _ in table]
+    weights = [w for _, w in table]
+    return rng.choices(values, weights=weights, k=k)
+
+
+def _sample(rng: random.Random, table: Sequence[Tuple[str, float]], lo: int, hi: int) -> List[str]:
+    """Return between *lo* and *hi* distinct weighted picks from *table*."""
+    k = rng.randint(lo, hi)
+    picked: List[str] = []
+    while len(picked) < k:
+        v = _weighted(rng, table)[0]
+        if v not in picked:
+            picked.append(v)
+    return picked
+
+
+def _maybe(rng: random.Random, p: float, value: Any) -> Any:
+    return value if rng.random() < p else None
+
+
+def generate_banks(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    banks = []
+    for i in range(n):
+        national = rng.random() < 0.15
+        footprint = "" if national else ",".join(_sample(rng, STATES, 1, 6))
+        banks.append({
+            "id": i + 1,
+            "fdic_certificate": str(10000 + i),
+            "legal_name": f"Synthetic Bank {i + 1:05d}",
+            "website": f"https://bank{i + 1}.example.com",
+            "lending_footprint": footprint,
+        })
+    return banks
+
+
+def generate_products(n: int, seed: int = 0, banks: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Return *n* product row dicts."""
+    rng = random.Random(seed + 1)
+    if banks is None:
+        banks = generate_banks(max(n // 8, 1), seed)
+    products = []
+    for i in range(n):
+        bank = rng.choice(banks)
+        lo, hi = rng.choice(LOAN_BANDS)
+        fico = rng.choice(FICO_CUTOFFS)
+        products.append({
+            "id": i + 1,
+            "bank_name": bank["legal_name"],
+            "fdic_certificate": bank["fdic_certificate"],
+            "product_type": _weighted(rng, PRODUCT_TYPES)[0],
+            "min_loan_amount_usd": lo,
+            "max_loan_amount_usd": hi,
+            "bank_footprint": bank["lending_footprint"],
+            # eligibility
+            "allowed_entities": _maybe(rng, 0.4, ",".join(_sample(rng, ENTITIES, 2, 4))),
+            "allowed_industries": _maybe(rng, 0.2, ",".join(_sample(rng, INDUSTRIES, 3, 8))),
+            "excluded_industries": _maybe(rng, 0.7, ",".join(HIGH_RISK_INDUSTRIES)),
+            "geographic_footprint": _maybe(rng, 0.3, ",".join(_sample(rng, STATES, 1, 10))),
+            "excluded_states": _maybe(rng, 0.1, ",".join(_sample(rng, STATES, 1, 2))),
+            "min_years_in_business": rng.choice([None, 0.5, 1, 2, 2, 3, 5]),
+            "min_annual_revenue_usd": rng.choice([None, 50000, 100000, 250000, 500000, 1000000]),
+            "requires_existing_relationship": rng.random() < 0.05,
+            # underwriting
+            "min_personal_credit_score": fico,
+            "min_business_credit_score": _maybe(rng, 0.3, rng.choice([140, 160, 180])),
+            "min_dscr": rng.choice(DSCR_CUTOFFS),
+            "min_current_ratio": _maybe(rng, 0.3, rng.choice([1.0, 1.1, 1.2, 1.5])),
+            "max_debt_to_equity": _maybe(rng, 0.4, rng.choice([2.0, 3.0, 4.0, 5.0])),
+            "cashflow_positive_required": rng.random() < 0.5,
+            "negative_balance_days_avg": _maybe(rng, 0.5, rng.choice([2, 3, 5, 10])),
+            "negative_balance_longest_streak": _maybe(rng, 0.4, rng.choice([3, 5, 7])),
+            "negative_balance_max_overdraft_usd": _maybe(rng, 0.3, rng.choice([1000, 5000, 10000])),
+            # deal & collateral
+            "deal_purpose_allowed": _maybe(rng, 0.6, ",".join(rng.sample(PURPOSES, rng.randint(2, 5)))),
+            "collateral_required": rng.choice(["Required", "Case-by-case", "Not required"]),
+            "eligible_collateral_types": "Real Estate,Equipment,Receivables",
+            "max_ltv_real_estate": rng.choice([None, 75, 80, 85]),
+            "max_ltv_equipment": rng.choice([None, 70, 80, 90]),
+            "max_ltv_receivables": rng.choice([None, 70, 80]),
+            "max_ltv_inventory": rng.choice([None, 40, 50]),
+            "personal_guarantee": rng.choice(["Required", "Case-by-case"]),
+            "guarantee_type": rng.choice(["Unlimited", "Limited"]),
+            "decision_timeline_prequal_days": rng.randint(1, 5),
+            "decision_timeline_underwriting_days": rng.randint(5, 30),
+            "average_time_to_fund_days": rng.randint(7, 60),
+            "special_conditions": _maybe(rng, 0.2, "Deposit relationship preferred"),
+        })
+    return products
+
+
+def generate_customers(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Return *n* customer profiles shaped like ``customer_profiles`` rows."""
+    rng = random.Random(seed + 2)
+    states = _weighted(rng, STATES, n)
+    industries = _weighted(rng, INDUSTRIES, n)
+    entities = _weighted(rng, ENTITIES, n)
+    product_types = _weighted(rng, PRODUCT_TYPES, n)
+    customers = []
+    for i in range(n):
+        revenue = round(rng.lognormvariate(13.0, 1.0), -3)
+        customers.append({
+            "id": i + 1,
+            "entity_type": entities[i],
+            "industry": industries[i],
+            "state": states[i],
+            "years_in_business": round(min(rng.expovariate(1 / 6.0), 40.0), 1),
+            "annual_revenue_usd": revenue,
+            "personal_credit_score": int(min(max(rng.gauss(700, 55), 300), 850)),
+            "business_credit_score": int(min(max(rng.gauss(165, 20), 101), 300)),
+            "dscr": round(max(rng.gauss(1.3, 0.35), 0.0), 2),
+            "current_ratio": round(max(rng.gauss(1.4, 0.5), 0.0), 2),
+            "debt_to_equity": round(max(rng.gauss(2.0, 1.2), 0.0), 2),
+            "cashflow_positive": rng.random() < 0.75,
+            "negative_balance_days_avg": round(rng.expovariate(1 / 2.0), 1),
+            "negative_balance_longest_streak": int(rng.expovariate(1 / 2.5)),
+            "negative_balance_max_overdraft_usd": round(rng.expovariate(1 / 2000.0), -1),
+            "requested_product_type": product_types[i],
+            "requested_amount_usd": round(min(revenue * rng.uniform(0.05, 0.5), 5000000), -3),
+            "use_of_proceeds": rng.choice(PURPOSES),
+        })
+    return customers
+
+
+def generate_research_records(products: List[Dict[str, Any]], banks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return research-JSON records (input of ``convert_json_to_csv``)."""
+    footprints = {b["fdic_certificate"]: b["lending_footprint"] for b in banks}
+    records = []
+    for p in products:
+        records.append({
+            "bank_legal_name": p["bank_name"],
+            "fdic_certificate": p["fdic_certificate"],
+            "website": f"https://bank{p['fdic_certificate']}.example.com",
+            "lending_footprint": footprints.get(p["fdic_certificate"], ""),
+            "excluded_states": p["excluded_states"],
+            "product_type": p["product_type"],
+            "purpose_allowed": p["deal_purpose_allowed"],
+            "min_loan_amount_usd": p["min_loan_amount_usd"],
+            "max_loan_amount_usd": p["max_loan_amount_usd"],
+            "rate_structure": "Variable",
+            "min_years_in_business": p["min_years_in_business"],
+            "min_annual_revenue_usd": p["min_annual_revenue_usd"],
+            "min_personal_credit_score": p["min_personal_credit_score"],
+            "min_dscr": p["min_dscr"],
+            "collateral_required": p["collateral_required"],
+            "eligible_collateral_types": p["eligible_collateral_types"].split(","),
+            "max_ltv_real_estate": p["max_ltv_real_estate"],
+            "max_ltv_equipment": p["max_ltv_equipment"],
+            "max_ltv_receivables": p["max_ltv_receivables"],
+            "max_ltv_inventory": p["max_ltv_inventory"],
+            "personal_guarantee": p["personal_guarantee"],
+            "guarantee_type": p["guarantee_type"],
+            "decision_timeline_prequal_days": p["decision_timeline_prequal_days"],
+            "decision_timeline_underwriting_days": p["decision_timeline_underwriting_days"],
+            "average_time_to_fund_days": p["average_time_to_fund_days"],
+            "industry_restrictions": p["excluded_industries"],
+            "special_conditions": p["special_conditions"],
+            "source_url": f"https://bank{p['fdic_certificate']}.example.com/loans/{p['id']}",
+            "last_verified": "2025-08-31",
+        })
+    return records
+
+
+def generate_balances(days: int, seed: int = 0) -> List[float]:
+    """Return a daily balance series as a random walk."""
+    rng = random.Random(seed + 3)
+    balance = rng.uniform(5000, 50000)
+    out = []
+    for _ in range(days):
+        balance += rng.gauss(0, 1500)
+        out.append(round(balance, 2))
+    return out
@@ -0,0 +1,11 @@
+-- 0003_catalog_version.sql
+
+-- Single-row counter bumped by every ingest; match caches key on it
+CREATE TABLE IF NOT EXISTS catalog_version (
+  id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO catalog_version (id, version) VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
@@ -0,0 +1,179 @@
+"""Columnar view of the product catalog used for bulk gate evaluation.
+
+Product rows are one dict per product, which is convenient for the
+row-at-a-time filters in ``match_customer`` but slow when every gate has to be
+evaluated for every product. :class:`ColumnarCatalog` converts such rows once
+into numpy arrays:
+
+* numeric thresholds become ``float64`` arrays with ``NaN`` for "no limit";
+* comma-separated lists (entities, industries, states, purposes) are
+  dictionary-encoded: an ``int32`` code per product pointing into a
+  :class:`ListDictionary` of distinct sets stored as bitsets over the column's
+  vocabulary, so a membership test is one bit lookup per *distinct* list
+  rather than a string comparison per product;
+* boolean requirements become ``bool`` arrays.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from etl.records import parse_csv
+
+# Product fields holding numeric thresholds
+NUMERIC_FIELDS: List[str] = [
+    "min_years_in_business",
+    "min_annual_revenue_usd",
+    "min_personal_credit_score",
+    "min_business_credit_score",
+    "min_dscr",
+    "min_current_ratio",
+    "max_debt_to_equity",
+    "negative_balance_days_avg",
+    "negative_balance_longest_streak",
+    "negative_balance_max_overdraft_usd",
+    "min_loan_amount_usd",
+    "max_loan_amount_usd",
+]
+
+# Product fields holding comma-separated lists. ``footprint`` is derived from
+# ``geographic_footprint`` falling back to the bank's ``bank_footprint``.
+LIST_FIELDS: List[str] = [
+    "allowed_entities",
+    "allowed_industries",
+    "excluded_industries",
+    "footprint",
+    "excluded_states",
+    "deal_purpose_allowed",
+]
+
+# Product fields holding boolean requirements
+FLAG_FIELDS: List[str] = [
+    "requires_existing_relationship",
+    "cashflow_positive_required",
+]
+
+
+def _to_float(value: Any) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def _list_source(product: Dict[str, Any], field: str) -> Any:
+    if field == "footprint":
+        return product.get("geographic_footprint") or product.get("bank_footprint")
+    return product.get(field)
+
+
+class ListDictionary:
+    """Distinct sets of a list column, stored as bitsets over a vocabulary.
+
+    ``bits`` is a ``uint8`` matrix with one row per distinct set; bit ``j``
+    (little-endian within each byte) is set when ``vocabulary[j]`` belongs to
+    that set.
+    """
+
+    def __init__(self, vocabulary: List[str], bits: np.ndarray):
+        self.vocabulary = vocabulary
+        self.bits = bits
+        self._index = {v: j for j, v in enumerate(vocabulary)}
+
+    @classmethod
+    def from_sets(cls, sets: List[frozenset]) -> "ListDictionary":
+        vocabulary = sorted(set().union(*sets)) if sets else []
+        index = {v: j for j, v in enumerate(vocabulary)}
+        dense = np.zeros((len(sets), max(len(vocabulary), 1)), dtype=bool)
+        for i, s in enumerate(sets):
+            for v in s:
+                dense[i, index[v]] = True
+        return cls(vocabulary, np.packbits(dense, axis=1, bitorder="little"))
+
+    def __len__(self) -> int:
+        return len(self.bits)
+
+    def contains(self, value: Optional[str]) -> np.ndarray:
+        """Return a per-set mask of sets containing *value*."""
+        j = self._index.get(value)
+        if j is None:
+            return np.zeros(len(self.bits), dtype=bool)
+        return ((self.bits[:, j >> 3] >> (j & 7)) & 1).astype(bool)
+
+    def nonempty(self) -> np.ndarray:
+        """Return a per-set mask of non-empty sets."""
+        return self.bits.any(axis=1)
+
+
+def encode_lists(values: Iterable[Any]) -> Tuple[np.ndarray, ListDictionary]:
+    """Dictionary-encode raw comma-separated *values*.
+
+    Returns ``(codes, dictionary)`` where row ``i`` holds the set number
+    ``codes[i]`` of *dictionary*.
+    """
+    index: Dict[frozenset, int] = {}
+    table: List[frozenset] = []
+    codes: List[int] = []
+    for raw in values:
+        key = frozenset(parse_csv(raw))
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(table)
+            table.append(key)
+        codes.append(code)
+    return np.asarray(codes, dtype=np.int32), ListDictionary.from_sets(table)
+
+
+class ColumnarCatalog:
+    """Products stored column-wise for vectorized evaluation."""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        bank_names: Sequence[str],
+        numeric: Dict[str, np.ndarray],
+        lists: Dict[str, Tuple[np.ndarray, ListDictionary]],
+        flags: Dict[str, np.ndarray],
+    ):
+        self.ids = ids
+        self.bank_names = bank_names
+        self.numeric = numeric
+        self.lists = lists
+        self.flags = flags
+
+    @classmethod
+    def from_products(cls, products: List[Dict[str, Any]]) -> "ColumnarCatalog":
+        """Build a catalog from product row dicts or :class:`ProductCriteria`."""
+        ids = np.asarray([p["id"] for p in products], dtype=np.int64)
+        bank_names = [p.get("bank_name") or "" for p in products]
+        numeric = {
+            f: np.asarray([_to_float(p.get(f)) for p in products], dtype=np.float64)
+            for f in NUMERIC_FIELDS
+        }
+        lists = {f: encode_lists(_list_source(p, f) for p in products) for f in LIST_FIELDS}
+        flags = {
+            f: np.asarray([bool(p.get(f)) for p in products], dtype=bool)
+            for f in FLAG_FIELDS
+        }
+        return cls(ids, bank_names, numeric, lists, flags)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def slice(self, start: int, end: int) -> "ColumnarCatalog":
+        """Return rows ``start:end`` as a catalog sharing this one's arrays."""
+        return ColumnarCatalog(
+            self.ids[start:end],
+            self.bank_names[start:end],
+            {f: a[start:end] for f, a in self.numeric.items()},
+            {f: (codes[start:end], d) for f, (codes, d) in self.lists.items()},
+            {f: a[start:end] for f, a in self.flags.items()},
+        )
+
+    def has_list(self, field: str) -> np.ndarray:
+        """Return a mask of products whose *field* list is non-empty."""
+        codes, dictionary = self.lists[field]
+        return dictionary.nonempty()[codes] if len(codes) else np.zeros(0, dtype=bool)
+
+    def list_contains(self, field: str, value: Optional[str]) -> np.ndarray:
+        """Return a mask of products whose *field* list contains *value*."""
+        codes, dictionary = self.lists[field]
+        return dictionary.contains(value)[codes] if len(codes) else np.zeros(0, dtype=bool)
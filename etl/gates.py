@@ -0,0 +1,69 @@
+"""Matching gates shared by the row filters, near-miss analysis and metrics.
+
+:data:`GATES` lists every check made by ``passes_eligibility``,
+``passes_underwriting`` and ``passes_deal`` in order, with a stable name.
+The module has no heavy dependencies so the row-based matcher can import it.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass(frozen=True)
+class Gate:
+    """Single matching gate.
+
+    Attributes:
+        name: Stable identifier used in reports.
+        stage: ``eligibility``, ``underwriting`` or ``deal``.
+        kind: ``min``/``max`` (numeric threshold), ``allowed``/``excluded``
+            (list membership) or ``flag`` (boolean requirement).
+        product_field: Catalog column holding the threshold or list.
+        customer_field: Customer attribute compared against it.
+        reason: Failure reason, matching the ``passes_*`` filters.
+    """
+
+    name: str
+    stage: str
+    kind: str
+    product_field: str
+    customer_field: str
+    reason: str
+
+
+GATES: List[Gate] = [
+    Gate("entity_type", "eligibility", "allowed", "allowed_entities", "entity_type", "entity not allowed"),
+    Gate("industry_allowed", "eligibility", "allowed", "allowed_industries", "industry", "industry not allowed"),
+    Gate("industry_excluded", "eligibility", "excluded", "excluded_industries", "industry", "industry excluded"),
+    Gate("state_footprint", "eligibility", "allowed", "footprint", "state", "state not in footprint"),
+    Gate("state_excluded", "eligibility", "excluded", "excluded_states", "state", "state excluded"),
+    Gate("years_in_business", "eligibility", "min", "min_years_in_business", "years_in_business", "insufficient years in business"),
+    Gate("annual_revenue", "eligibility", "min", "min_annual_revenue_usd", "annual_revenue_usd", "insufficient revenue"),
+    Gate("existing_relationship", "eligibility", "flag", "requires_existing_relationship", "", "requires existing relationship"),
+    Gate("personal_credit_score", "underwriting", "min", "min_personal_credit_score", "personal_credit_score", "personal credit below minimum"),
+    Gate("business_credit_score", "underwriting", "min", "min_business_credit_score", "business_credit_score", "business credit below minimum"),
+    Gate("dscr", "underwriting", "min", "min_dscr", "dscr", "DSCR below minimum"),
+    Gate("current_ratio", "underwriting", "min", "min_current_ratio", "current_ratio", "current ratio below minimum"),
+    Gate("debt_to_equity", "underwriting", "max", "max_debt_to_equity", "debt_to_equity", "debt-to-equity above maximum"),
+    Gate("cashflow_positive", "underwriting", "flag", "cashflow_positive_required", "cashflow_positive", "requires positive cashflow"),
+    Gate("negative_balance_days", "underwriting", "max", "negative_balance_days_avg", "negative_balance_days_avg", "too many negative balance days"),
+    Gate("negative_balance_streak", "underwriting", "max", "negative_balance_longest_streak", "negative_balance_longest_streak", "negative balance streak too long"),
+    Gate("negative_balance_overdraft", "underwriting", "max", "negative_balance_max_overdraft_usd", "negative_balance_max_overdraft_usd", "overdraft amount too large"),
+    Gate("amount_min", "deal", "min", "min_loan_amount_usd", "requested_amount_usd", "amount below minimum"),
+    Gate("amount_max", "deal", "max", "max_loan_amount_usd", "requested_amount_usd", "amount above maximum"),
+    Gate("use_of_proceeds", "deal", "allowed", "deal_purpose_allowed", "use_of_proceeds", "purpose not allowed"),
+]
+
+
+def check_name(reason: str) -> str:
+    """Map a ``passes_*`` failure reason to the name of its gate.
+
+    Some reasons embed customer values (``"state TX not in footprint"``); the
+    name does not, so it is safe as a metrics label.
+    """
+    for gate in GATES:
+        head, _, tail = gate.reason.partition(" ")
+        if reason == gate.reason or (reason.startswith(head + " ") and reason.endswith(" " + tail)):
+            return gate.name
+    return "other"
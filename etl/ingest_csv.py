@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 import argparse, sys
-import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_values
-from dateutil.parser import isoparse
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+# pandas, psycopg2 and dateutil are imported where they are used so that
+# ``--help`` and importing this module stay fast and driver-free.
+if TYPE_CHECKING:
+    import pandas as pd
+
+if __package__ in (None, ""):
+    # Allow ``python etl/ingest_csv.py`` to import the repo's ``src`` package
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.observability import profiler
 
 REQUIRED_COLS = [
     "bank_legal_name","fdic_certificate","lending_footprint","product_type",
@@ -11,7 +20,9 @@ REQUIRED_COLS = [
     "source_url","last_verified"
 ]
 
-def validate_df(df: pd.DataFrame):
+def validate_df(df: "pd.DataFrame"):
+    from dateutil.parser import isoparse
+
     missing = [c for c in REQUIRED_COLS if c not in df.columns]
     if missing:
         raise ValueError(f"Missing columns: {missing}")
@@ -42,15 +53,26 @@ def upsert_bank(cur, rows):
         lending_footprint = COALESCE(EXCLUDED.lending_footprint, banks.lending_footprint)
     RETURNING id, fdic_certificate
     """
+    from psycopg2.extras import execute_values
+
     execute_values(cur, sql, rows, page_size=100)
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--dsn", required=True)
     ap.add_argument("--csv", required=True)
-    args = ap.parse_args()
+    ap.add_argument("--profile", action="store_true", help="Print per-stage timings to stderr")
+    ap.add_argument("--snapshot", help="Export the matchable catalog to this snapshot file after loading")
+    args = ap.parse_args(argv)
 
-    df = pd.read_csv(args.csv).fillna("")
+    prof = profiler.enable() if args.profile else None
+
+    import pandas as pd
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    with profiler.stage("ingest.read_csv"):
+        df = pd.read_csv(args.csv).fillna("")
 
     # --- Normalize IDs as strings ---
     df["fdic_certificate"] = df["fdic_certificate"].astype(str).str.strip()
@@ -59,7 +81,8 @@ def main():
     df["lending_footprint"] = df.get("lending_footprint", "").astype(str).str.strip()
     # --------------------------------
 
-    df = validate_df(df)
+    with profiler.stage("ingest.validate"):
+        df = validate_df(df)
 
     conn = psycopg2.connect(args.dsn)
     conn.autocommit = False
@@ -68,10 +91,12 @@ def main():
     # Upsert banks
     bank_rows = df[["fdic_certificate","bank_legal_name","website","lending_footprint"]].drop_duplicates()
     print(f"Upserting {len(bank_rows)} bank rows…")
-    upsert_bank(cur, [(r.fdic_certificate, r.bank_legal_name, r.website, r.lending_footprint) for r in bank_rows.itertuples()])
+    with profiler.stage("db.upsert_banks"):
+        upsert_bank(cur, [(r.fdic_certificate, r.bank_legal_name, r.website, r.lending_footprint) for r in bank_rows.itertuples()])
 
     # Map fdic -> bank_id
-    cur.execute("SELECT id, fdic_certificate FROM banks")
+    with profiler.stage("db.select_bank_ids"):
+        cur.execute("SELECT id, fdic_certificate FROM banks")
     id_map = {str(fdic).strip(): bid for (bid, fdic) in cur.fetchall()}
 
     # Insert products
@@ -92,45 +117,60 @@ def main():
             return None
 
     prod_values = []
-    for r in df[prod_cols].itertuples(index=False):
-        fdic = str(r[0]).strip()
-        bank_id = id_map.get(fdic)
-        if not bank_id:
-            raise RuntimeError(f"Bank not found for FDIC {fdic}")
-        vals = [
-            bank_id, r[1], to_num(r[2]), to_num(r[3]), r[4],
-            to_num(r[5]), to_num(r[6]), to_num(r[7]), to_num(r[8]),
-            to_num(r[9]), to_num(r[10]), to_num(r[11]), to_num(r[12]),
-            r[13] or "Unknown", r[14] or "Unknown", r[15] or "",
-            int(r[16]) if str(r[16]).isdigit() else None,
-            int(r[17]) if str(r[17]).isdigit() else None,
-            r[18]
-        ]
-        prod_values.append(vals)
+    with profiler.stage("ingest.build_products"):
+        for r in df[prod_cols].itertuples(index=False):
+            fdic = str(r[0]).strip()
+            bank_id = id_map.get(fdic)
+            if not bank_id:
+                raise RuntimeError(f"Bank not found for FDIC {fdic}")
+            vals = [
+                bank_id, r[1], to_num(r[2]), to_num(r[3]), r[4],
+                to_num(r[5]), to_num(r[6]), to_num(r[7]), to_num(r[8]),
+                to_num(r[9]), to_num(r[10]), to_num(r[11]), to_num(r[12]),
+                r[13] or "Unknown", r[14] or "Unknown", r[15] or "",
+                int(r[16]) if str(r[16]).isdigit() else None,
+                int(r[17]) if str(r[17]).isdigit() else None,
+                r[18]
+            ]
+            prod_values.append(vals)
 
     print(f"Inserting {len(prod_values)} product rows…")
-    execute_values(cur, """
-    INSERT INTO products (
-      bank_id, product_type, min_loan_amount_usd, max_loan_amount_usd, rate_structure,
-      min_years_in_business, min_annual_revenue_usd, min_personal_credit_score, min_dscr,
-      max_ltv_real_estate, max_ltv_equipment, max_ltv_receivables, max_ltv_inventory,
-      personal_guarantee, collateral_required, industry_restrictions,
-      decision_timeline_prequal_days, decision_timeline_underwriting_days, last_verified
-    ) VALUES %s
-    """, prod_values, page_size=100)
+    with profiler.stage("db.insert_products"):
+        execute_values(cur, """
+        INSERT INTO products (
+          bank_id, product_type, min_loan_amount_usd, max_loan_amount_usd, rate_structure,
+          min_years_in_business, min_annual_revenue_usd, min_personal_credit_score, min_dscr,
+          max_ltv_real_estate, max_ltv_equipment, max_ltv_receivables, max_ltv_inventory,
+          personal_guarantee, collateral_required, industry_restrictions,
+          decision_timeline_prequal_days, decision_timeline_underwriting_days, last_verified
+        ) VALUES %s
+        """, prod_values, page_size=100)
 
     # Insert sources (product-level, same URL per row for now)
-    cur.execute("SELECT id FROM products ORDER BY id DESC LIMIT %s", (len(prod_values),))
-    inserted_ids = [row[0] for row in cur.fetchall()][::-1]  # naive mapping for demo
-    src_values = [(pid, url, None, None, None) for pid, url in zip(inserted_ids, df["source_url"].tolist())]
-    execute_values(cur, """
-    INSERT INTO sources (product_id, source_url, evidence_type, title, date_accessed)
-    VALUES %s
-    """, src_values, page_size=100)
-
-    conn.commit()
+    with profiler.stage("db.insert_sources"):
+        cur.execute("SELECT id FROM products ORDER BY id DESC LIMIT %s", (len(prod_values),))
+        inserted_ids = [row[0] for row in cur.fetchall()][::-1]  # naive mapping for demo
+        src_values = [(pid, url, None, None, None) for pid, url in zip(inserted_ids, df["source_url"].tolist())]
+        execute_values(cur, """
+        INSERT INTO sources (product_id, source_url, evidence_type, title, date_accessed)
+        VALUES %s
+        """, src_values, page_size=100)
+
+    # Bump the catalog version so cached match results are invalidated
+    cur.execute("UPDATE catalog_version SET version = version + 1, updated_at = now() WHERE id = 1")
+
+    with profiler.stage("db.commit"):
+        conn.commit()
     print(f"Loaded {len(prod_values)} products from {args.csv}")
+
+    if args.snapshot:
+        from etl.snapshot import export_snapshot
+        with profiler.stage("snapshot.export"):
+            rows = export_snapshot(conn, args.snapshot)
+        print(f"Wrote catalog snapshot with {rows} products to {args.snapshot}")
     cur.close(); conn.close()
+    if prof is not None:
+        print(prof.summary(), file=sys.stderr)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""Background batch-match jobs backed by a SQLite job table.
+
+A job is a set of customers (``customer_profiles`` ids, or profiles parsed
+from an uploaded CSV/NDJSON file) split into chunks. Chunks are stored in a
+SQLite file opened in WAL mode, so any number of worker threads or processes
+on the host can claim them without an external broker:
+
+* :meth:`JobStore.submit` writes the job and its chunks;
+* :func:`run_worker` claims the oldest queued chunk (``BEGIN IMMEDIATE``
+  makes the claim atomic), matches each customer and stores the results as
+  NDJSON. It renews its lease while it works; chunks whose worker died are
+  re-queued after ``lease_seconds``, and a worker that lost its lease cannot
+  overwrite the new owner's result;
+* a chunk that raises is retried up to ``max_attempts`` times, then reported
+  as one error line per customer, so every job finishes;
+* :meth:`JobStore.status` reports progress and :meth:`JobStore.iter_results`
+  streams finished chunks in order.
+
+Workers run inside the API (``BANKMATCH_JOB_WORKERS``) or standalone:
+
+    python etl/jobs.py worker --jobs-db data/jobs.db \
+        --snapshot data/catalog.snap --dsn postgres://... --processes 4
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+if __package__ in (None, ""):
+    # Allow ``python etl/jobs.py`` to import the repo's ``etl``/``src`` packages
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from etl.records import CustomerProfile
+from etl.streaming import ROW_ERRORS, dumps, iter_customers_csv, iter_customers_ndjson
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS match_jobs (
+  id TEXT PRIMARY KEY,
+  created_at REAL NOT NULL,
+  top INTEGER NOT NULL,
+  total_customers INTEGER NOT NULL,
+  total_chunks INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS match_job_chunks (
+  job_id TEXT NOT NULL REFERENCES match_jobs(id) ON DELETE CASCADE,
+  seq INTEGER NOT NULL,
+  status TEXT NOT NULL DEFAULT 'queued',
+  customers TEXT NOT NULL,
+  size INTEGER NOT NULL,
+  results TEXT,
+  error TEXT,
+  claimed_by TEXT,
+  claimed_at REAL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS idx_match_job_chunks_status ON match_job_chunks(status, claimed_at);
+"""
+
+
+# ---------- Parsing uploaded customer files ----------
+
+def parse_customers_csv(text: str) -> List[Dict[str, Any]]:
+    return list(iter_customers_csv(io.StringIO(text, newline="")))
+
+
+def parse_customers_ndjson(text: str) -> List[Dict[str, Any]]:
+    return list(iter_customers_ndjson(io.StringIO(text)))
+
+
+# ---------- Job store ----------
+
+class JobStore:
+    """SQLite-backed job and chunk tables shared by the API and workers."""
+
+    def __init__(self, path: str, lease_seconds: float = 300.0,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(match_job_chunks)")}
+            if "attempts" not in columns:  # job files created before retries
+                conn.execute("ALTER TABLE match_job_chunks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def submit(self, customers: List[Dict[str, Any]], top: int = 5,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+        """Queue *customers* (dicts with ``customer_id`` or inline profiles).
+
+        Returns the new job id.
+        """
+        if not customers:
+            raise ValueError("Job has no customers")
+        job_id = uuid.uuid4().hex
+        chunks = [customers[i:i + chunk_size] for i in range(0, len(customers), chunk_size)]
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO match_jobs (id, created_at, top, total_customers, total_chunks)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (job_id, time.time(), top, len(customers), len(chunks)),
+            )
+            conn.executemany(
+                "INSERT INTO match_job_chunks (job_id, seq, customers, size) VALUES (?, ?, ?, ?)",
+                [(job_id, seq, dumps(chunk), len(chunk))
+                 for seq, chunk in enumerate(chunks)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest runnable chunk, or return ``None``.
+
+        Chunks whose lease expired on their last allowed attempt (the worker
+        keeps dying on them) are marked failed instead.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE match_job_chunks SET status = 'failed', error = COALESCE(error, 'Lease expired')"
+                " WHERE status = 'running' AND claimed_at < ? AND attempts >= ?",
+                (now - self.lease_seconds, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT c.job_id, c.seq, c.customers, j.top"
+                " FROM match_job_chunks c JOIN match_jobs j ON j.id = c.job_id"
+                " WHERE c.status = 'queued' OR (c.status = 'running' AND c.claimed_at < ?)"
+                " ORDER BY j.created_at, c.seq LIMIT 1",
+                (now - self.lease_seconds,),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE match_job_chunks SET status = 'running', claimed_by = ?, claimed_at = ?,"
+                " attempts = attempts + 1 WHERE job_id = ? AND seq = ?",
+                (worker_id, now, row[0], row[1]),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return {"job_id": row[0], "seq": row[1], "customers": json.loads(row[2]), "top": row[3]}
+
+    def heartbeat(self, job_id: str, seq: int, worker_id: str) -> bool:
+        """Renew *worker_id*'s lease on a chunk; ``False`` if it lost the chunk."""
+        return self._update_claimed(
+            "UPDATE match_job_chunks SET claimed_at = ?"
+            " WHERE job_id = ? AND seq = ? AND claimed_by = ? AND status = 'running'",
+            (time.time(), job_id, seq, worker_id),
+        )
+
+    def complete(self, job_id: str, seq: int, worker_id: str,
+                 results: List[Dict[str, Any]]) -> bool:
+        """Store the results of a chunk still leased by *worker_id*.
+
+        Returns ``False`` (and stores nothing) if the lease was lost.
+        """
+        payload = "".join(dumps(r) + "\n" for r in results)
+        return self._update_claimed(
+            "UPDATE match_job_chunks SET status = 'done', results = ?, error = NULL"
+            " WHERE job_id = ? AND seq = ? AND claimed_by = ? AND status = 'running'",
+            (payload, job_id, seq, worker_id),
+        )
+
+    def fail(self, job_id: str, seq: int, worker_id: str, error: str) -> bool:
+        """Re-queue a chunk leased by *worker_id*, or fail it after ``max_attempts``.
+
+        Returns ``False`` (and changes nothing) if the lease was lost.
+        """
+        return self._update_claimed(
+            "UPDATE match_job_chunks SET error = ?, claimed_by = NULL, claimed_at = NULL,"
+            " status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END"
+            " WHERE job_id = ? AND seq = ? AND claimed_by = ? AND status = 'running'",
+            (error, self.max_attempts, job_id, seq, worker_id),
+        )
+
+    def _update_claimed(self, sql: str, params: tuple) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute(sql, params).rowcount == 1
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return progress for *job_id*, or ``None`` if it does not exist."""
+        with closing(self._connect()) as conn:
+            job = conn.execute(
+                "SELECT created_at, top, total_customers, total_chunks FROM match_jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM match_job_chunks WHERE job_id = ? GROUP BY status",
+                (job_id,),
+            ).fetchall())
+            processed = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM match_job_chunks"
+                " WHERE job_id = ? AND status IN ('done', 'failed')",
+                (job_id,),
+            ).fetchone()[0]
+            errors = [r[0] for r in conn.execute(
+                "SELECT error FROM match_job_chunks WHERE job_id = ? AND status = 'failed' ORDER BY seq",
+                (job_id,),
+            ).fetchall()]
+        total_chunks = job[3]
+        done, failed = counts.get("done", 0), counts.get("failed", 0)
+        # Failed chunks are final (after retries), so a job with some still
+        # finishes; their customers get error lines in the results.
+        if done + failed == total_chunks:
+            state = "done"
+        elif counts.get("running") or done or failed:
+            state = "running"
+        else:
+            state = "queued"
+        return {
+            "id": job_id,
+            "status": state,
+            "created_at": job[0],
+            "top": job[1],
+            "total_customers": job[2],
+            "processed_customers": processed,
+            "total_chunks": total_chunks,
+            "done_chunks": done,
+            "failed_chunks": failed,
+            "errors": errors,
+        }
+
+    def iter_results(self, job_id: str) -> Iterator[str]:
+        """Yield NDJSON lines of finished chunks in submission order.
+
+        Customers of failed chunks get a line carrying the chunk's error.
+        Each chunk is read on its own short-lived connection: a
+        ``StreamingResponse`` advances this generator from different
+        threadpool threads, and a SQLite connection is bound to its thread.
+        """
+        with closing(self._connect()) as conn:
+            seqs = [r[0] for r in conn.execute(
+                "SELECT seq FROM match_job_chunks"
+                " WHERE job_id = ? AND status IN ('done', 'failed') ORDER BY seq",
+                (job_id,),
+            ).fetchall()]
+        # One chunk at a time keeps memory bounded by the chunk size
+        for seq in seqs:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT status, results, customers, error FROM match_job_chunks"
+                    " WHERE job_id = ? AND seq = ?",
+                    (job_id, seq),
+                ).fetchone()
+            status, results, customers, error = row
+            if status == "done":
+                yield from io.StringIO(results or "")
+            else:
+                for offset, item in enumerate(json.loads(customers)):
+                    yield dumps(dict(_ref(item, offset), error=error)) + "\n"
+
+
+# ---------- Workers ----------
+
+Matcher = Callable[[Any, int], List[Dict[str, Any]]]
+
+
+class LeaseLost(Exception):
+    """The chunk being processed was re-queued and claimed by another worker."""
+
+
+def make_matcher(dsn: Optional[str] = None, snapshot: Optional[str] = None,
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 300.0):
+    """Return ``(match, resolve)`` callables for one worker.
+
+    ``match(customer, top)`` ranks products from the snapshot when given,
+    otherwise from Postgres, and serves repeated profiles from an in-process
+    :class:`~etl.match_cache.MatchCache` (``cache_size=0`` disables it).
+    ``resolve(customer_id)`` loads a stored profile and needs a DSN.
+    """
+    from etl.match_cache import MatchCache, cached_call, cached_match_products
+
+    conn = None
+    if dsn:
+        import psycopg2
+
+        conn = psycopg2.connect(dsn)
+        # Workers only read and live long: autocommit keeps the session from
+        # idling in a transaction, and a failed query cannot leave it aborted
+        # for the next chunk.
+        conn.autocommit = True
+    # One cache per matcher: each worker thread builds its own matcher, and
+    # MatchCache is not thread-safe.
+    cache = MatchCache(maxsize=cache_size, ttl=cache_ttl) if cache_size > 0 else None
+    if snapshot:
+        from etl.snapshot import open_snapshot, rank_catalog
+
+        snap = open_snapshot(snapshot)
+
+        def rank(customer, top):
+            return rank_catalog(snap.catalog(customer["requested_product_type"]), customer, top)
+
+        def match(customer, top):
+            if cache is None:
+                return rank(customer, top)
+            return cached_call(cache, customer, top, snap.catalog_version,
+                               lambda: rank(customer, top))
+    elif conn is not None:
+        from etl.match_customer import match_products
+
+        def match(customer, top):
+            if cache is None:
+                return match_products(conn, customer, top)
+            return cached_match_products(conn, customer, top, cache)
+    else:
+        raise ValueError("A worker needs --dsn or --snapshot to match against")
+
+    def resolve(customer_id: int) -> CustomerProfile:
+        if conn is None:
+            raise ValueError("customer_id requires a database connection (--dsn)")
+        from etl.records import fetch_customer_profile
+
+        return fetch_customer_profile(conn, customer_id)
+
+    return match, resolve
+
+
+def _ref(item: Dict[str, Any], offset: int) -> Dict[str, Any]:
+    """Identify a chunk customer by ``customer_id``, else by its upload row."""
+    ref = item.get("customer_id")
+    return {"customer_id": ref} if ref is not None else {"row": item.get("row", offset)}
+
+
+def process_chunk(chunk: Dict[str, Any], match: Matcher,
+                  resolve: Callable[[int], CustomerProfile],
+                  on_progress: Optional[Callable[[], None]] = None) -> List[Dict[str, Any]]:
+    """Match every customer of *chunk*; per-customer errors are reported inline.
+
+    *on_progress* is called after each customer (``run_worker`` renews the
+    lease from it).
+    """
+    results = []
+    for offset, item in enumerate(chunk["customers"]):
+        ref = item.get("customer_id")
+        line = _ref(item, offset)
+        try:
+            if ref is not None:
+                customer = resolve(int(ref))
+            else:
+                customer = CustomerProfile(**item)
+            if not customer.get("requested_product_type"):
+                raise ValueError("requested_product_type is required")
+            line["matches"] = match(customer, chunk["top"])
+        except ROW_ERRORS as exc:
+            line["error"] = str(exc)
+        results.append(line)
+        if on_progress is not None:
+            on_progress()
+    return results
+
+
+def _lease_keeper(store: JobStore, chunk: Dict[str, Any], worker_id: str) -> Callable[[], None]:
+    """Return a callback renewing *worker_id*'s lease on *chunk* every third of a lease."""
+    interval = store.lease_seconds / 3
+    renewed = time.monotonic()
+
+    def renew() -> None:
+        nonlocal renewed
+        if time.monotonic() - renewed < interval:
+            return
+        if not store.heartbeat(chunk["job_id"], chunk["seq"], worker_id):
+            raise LeaseLost(f"Chunk {chunk['seq']} of job {chunk['job_id']} was taken over")
+        renewed = time.monotonic()
+
+    return renew
+
+
+def run_worker(store: JobStore, match: Matcher, resolve: Callable[[int], CustomerProfile],
+               stop: Optional[threading.Event] = None, poll_interval: float = 1.0,
+               worker_id: Optional[str] = None, once: bool = False) -> int:
+    """Process chunks until *stop* is set (or the queue is empty with *once*).
+
+    Returns the number of chunks processed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    processed = 0
+    while stop is None or not stop.is_set():
+        chunk = store.claim(worker_id)
+        if chunk is None:
+            if once:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+            continue
+        try:
+            results = process_chunk(chunk, match, resolve, _lease_keeper(store, chunk, worker_id))
+        except LeaseLost:
+            pass  # another worker owns the chunk now
+        except Exception as exc:
+            store.fail(chunk["job_id"], chunk["seq"], worker_id, f"{type(exc).__name__}: {exc}")
+        else:
+            store.complete(chunk["job_id"], chunk["seq"], worker_id, results)
+        processed += 1
+    return processed
+
+
+def start_worker_threads(store: JobStore, count: int, dsn: Optional[str],
+                         snapshot: Optional[str]) -> threading.Event:
+    """Start *count* daemon worker threads; set the returned event to stop them."""
+    stop = threading.Event()
+    for i in range(count):
+        match, resolve = make_matcher(dsn, snapshot)
+        threading.Thread(
+            target=run_worker, args=(store, match, resolve, stop),
+            name=f"match-job-worker-{i}", daemon=True,
+        ).start()
+    return stop
+
+
+def _worker_process(jobs_db: str, dsn: Optional[str], snapshot: Optional[str], once: bool) -> None:
+    match, resolve = make_matcher(dsn, snapshot)
+    run_worker(JobStore(jobs_db), match, resolve, once=once)
+
+
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Batch-match job worker")
+    sub = ap.add_subparsers(dest="command", required=True)
+    w = sub.add_parser("worker", help="Process queued match jobs")
+    w.add_argument("--jobs-db", required=True, help="SQLite job database")
+    w.add_argument("--dsn", help="Postgres DSN (needed for customer ids / DB matching)")
+    w.add_argument("--snapshot", help="Catalog snapshot to match against")
+    w.add_argument("--processes", type=int, default=1)
+    w.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    s = sub.add_parser("status", help="Show job progress")
+    s.add_argument("--jobs-db", required=True)
+    s.add_argument("job_id")
+    args = ap.parse_args(argv)
+
+    if args.command == "status":
+        status = JobStore(args.jobs_db).status(args.job_id)
+        if status is None:
+            raise SystemExit(f"Job {args.job_id} not found")
+        print(json.dumps(status, indent=2))
+        return
+
+    JobStore(args.jobs_db)  # create tables before workers start
+    if args.processes <= 1:
+        _worker_process(args.jobs_db, args.dsn, args.snapshot, args.once)
+        return
+    import multiprocessing
+
+    procs = [
+        multiprocessing.Process(target=_worker_process,
+                                args=(args.jobs_db, args.dsn, args.snapshot, args.once))
+        for _ in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
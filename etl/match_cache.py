@@ -0,0 +1,206 @@
+"""Cache for ``match_products`` results.
+
+Results are keyed by a canonical hash of the customer fields the gates and the
+score actually read, the ``top`` limit and the catalog version maintained by
+``ingest_csv`` (table ``catalog_version``). Because the version is part of the
+key, an ingest automatically invalidates every cached result.
+
+Two tiers are available:
+
+* an in-process LRU with a TTL (always on);
+* an optional SQLite file shared between CLI runs or worker processes. Rows
+  written for an older catalog version are purged when a newer one is seen,
+  and expired rows are pruned on every write.
+
+Hits return copies of the cached rows, so callers may mutate them.
+
+Example:
+    cache = MatchCache(maxsize=1024, ttl=300, path="/tmp/bankmatch-cache.db")
+    matches = cached_match_products(conn, customer, top=10, cache=cache)
+    print(cache.stats())
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from etl.records import CUSTOMER_MATCH_FIELDS
+
+# Customer fields read by the eligibility/underwriting/deal gates and scoring
+CUSTOMER_KEY_FIELDS: List[str] = list(CUSTOMER_MATCH_FIELDS)
+
+
+def _canonical(value: Any) -> Any:
+    # Numbers compare equal across int/float/Decimal in the gates, so they
+    # hash alike; strings are hashed as-is because the gates compare them raw.
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+    return str(value)
+
+
+def _json_default(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+
+def cache_key(customer: Dict[str, Any], catalog_version: int, top: int) -> str:
+    """Return a stable hash of the match inputs for *customer*."""
+    payload = {f: _canonical(customer.get(f)) for f in CUSTOMER_KEY_FIELDS}
+    payload["_catalog_version"] = int(catalog_version)
+    payload["_top"] = int(top)
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def fetch_catalog_version(conn) -> int:
+    """Return the current catalog version from the database."""
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM catalog_version WHERE id = 1")
+    row = cur.fetchone()
+    cur.close()
+    return int(row[0]) if row else 0
+
+
+def _copy(result: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy result rows so callers cannot mutate cached entries."""
+    return [dict(row) for row in result]
+
+
+class MatchCache:
+    """Two-tier (memory LRU/TTL + optional SQLite) cache of match results."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 300.0,
+                 path: Optional[str] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._memory: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_version: Optional[int] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            self._disk = sqlite3.connect(path, timeout=5.0)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS match_cache ("
+                " key TEXT PRIMARY KEY, catalog_version INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, result TEXT NOT NULL)"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS idx_match_cache_created_at ON match_cache(created_at)"
+            )
+            self._disk.commit()
+
+    def _sync_version(self, catalog_version: int) -> None:
+        """Drop disk rows written for other catalog versions."""
+        if self._disk is None or self._disk_version == catalog_version:
+            return
+        self._disk.execute("DELETE FROM match_cache WHERE catalog_version != ?", (catalog_version,))
+        self._disk.commit()
+        self._disk_version = catalog_version
+
+    def get(self, key: str, catalog_version: int) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results for *key* or ``None`` on a miss."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            stored_at, result = entry
+            if self.ttl is None or self.clock() - stored_at < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return _copy(result)
+            del self._memory[key]
+
+        if self._disk is not None:
+            self._sync_version(catalog_version)
+            oldest = 0.0 if self.ttl is None else time.time() - self.ttl
+            row = self._disk.execute(
+                "SELECT result FROM match_cache"
+                " WHERE key = ? AND catalog_version = ? AND created_at >= ?",
+                (key, catalog_version, oldest),
+            ).fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                self._remember(key, result)
+                self.disk_hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, catalog_version: int, result: List[Dict[str, Any]]) -> None:
+        """Store *result* under *key* in every enabled tier."""
+        self._remember(key, result)
+        if self._disk is not None:
+            self._sync_version(catalog_version)
+            now = time.time()
+            if self.ttl is not None:
+                # Expired rows are never read again; keep a shared file bounded
+                self._disk.execute("DELETE FROM match_cache WHERE created_at < ?", (now - self.ttl,))
+            self._disk.execute(
+                "INSERT OR REPLACE INTO match_cache (key, catalog_version, created_at, result)"
+                " VALUES (?, ?, ?, ?)",
+                (key, catalog_version, now, json.dumps(result, default=_json_default)),
+            )
+            self._disk.commit()
+
+    def _remember(self, key: str, result: List[Dict[str, Any]]) -> None:
+        self._memory[key] = (self.clock(), _copy(result))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.execute("DELETE FROM match_cache")
+            self._disk.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the in-memory entry count."""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._memory),
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+def cached_match_products(conn, customer: Dict[str, Any], top: int,
+                          cache: MatchCache,
+                          catalog_version: Optional[int] = None) -> List[Dict[str, Any]]:
+    """``match_products`` with results served from *cache* when possible.
+
+    *catalog_version* may be passed by callers that already know it (e.g. an
+    API worker polling it periodically) to skip the version query.
+    """
+    from etl.match_customer import match_products
+
+    if catalog_version is None:
+        catalog_version = fetch_catalog_version(conn)
+    return cached_call(cache, customer, top, catalog_version,
+                       lambda: match_products(conn, customer, top))
+
+
+def cached_call(cache: MatchCache, customer: Dict[str, Any], top: int,
+                catalog_version: int,
+                compute: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Return cached results for *customer* or store the result of *compute*."""
+    key = cache_key(customer, catalog_version, top)
+    result = cache.get(key, catalog_version)
+    if result is None:
+        result = compute()
+        cache.put(key, catalog_version, result)
+    return result
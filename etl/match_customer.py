@@ -15,10 +15,24 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
+from pathlib import Path
 from typing import Dict, List, Tuple, Any
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
+if __package__ in (None, ""):
+    # Allow ``python etl/match_customer.py`` to import the repo's ``etl``/``src`` packages
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from etl.gates import check_name
+from etl.records import (
+    PRODUCT_DISPLAY_FIELDS,
+    CustomerProfile,
+    fetch_customer_profile,
+    fetch_product_criteria,
+    load_display_fields,
+    parse_csv,
+)
+from src.observability import profiler
 
 # Weights for scoring (very lightweight heuristic)
 W_FICO = 0.25
@@ -27,55 +41,37 @@ W_AMOUNT = 0.25
 W_NEG_DAYS = 0.25
 
 
-def parse_csv(value: Any) -> List[str]:
-    """Split comma-separated strings into a list of trimmed tokens."""
-    if not value:
-        return []
-    return [v.strip() for v in str(value).split(",") if v.strip()]
-
+# ---------- Loading ----------
 
 def fetch_customer(conn, customer_id: int) -> Dict[str, Any]:
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute("SELECT * FROM customer_profiles WHERE id = %s", (customer_id,))
-    row = cur.fetchone()
-    if not row:
-        raise SystemExit(f"Customer id {customer_id} not found")
-    return dict(row)
+    """Return the stored profile as a dict (see ``fetch_customer_profile``)."""
+    return fetch_customer_profile(conn, customer_id).to_dict()
 
 
 def fetch_products(conn, product_type: str) -> List[Dict[str, Any]]:
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute(
-        """
-        SELECT p.id, b.legal_name AS bank_name, p.product_type,
-               p.min_loan_amount_usd, p.max_loan_amount_usd,
-               b.lending_footprint AS bank_footprint,
-               e.allowed_entities, e.allowed_industries, e.excluded_industries,
-               e.geographic_footprint, e.excluded_states,
-               e.min_years_in_business, e.min_annual_revenue_usd,
-               e.requires_existing_relationship,
-               u.min_personal_credit_score, u.min_business_credit_score, u.min_dscr,
-               u.min_current_ratio, u.max_debt_to_equity, u.cashflow_positive_required,
-               u.negative_balance_days_avg, u.negative_balance_longest_streak,
-               u.negative_balance_max_overdraft_usd,
-               c.purpose_allowed AS deal_purpose_allowed,
-               c.collateral_required, c.eligible_collateral_types,
-               c.max_ltv_real_estate, c.max_ltv_equipment,
-               c.max_ltv_receivables, c.max_ltv_inventory,
-               c.personal_guarantee, c.guarantee_type,
-               c.decision_timeline_prequal_days,
-               c.decision_timeline_underwriting_days,
-               c.average_time_to_fund_days, c.special_conditions
-        FROM products p
-        JOIN banks b ON p.bank_id = b.id
-        LEFT JOIN product_eligibility e ON e.product_id = p.id
-        LEFT JOIN product_underwriting u ON u.product_id = p.id
-        LEFT JOIN product_collateral c ON c.product_id = p.id
-        WHERE p.product_type = %s
-        """,
-        (product_type,),
-    )
-    return [dict(r) for r in cur.fetchall()]
+    """Return full product rows of *product_type*, display fields included.
+
+    Matching itself uses ``fetch_product_criteria``, which skips the display
+    fields; list criteria come back as ``frozenset``.
+    """
+    records = fetch_product_criteria(conn, product_type)
+    display = load_display_fields(conn, [p.id for p in records])
+    rows = []
+    for p in records:
+        row = p.to_dict()
+        del row["display"]
+        row.update(display[p.id])
+        rows.append(row)
+    return rows
+
+
+def add_display_fields(conn, matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge the display-only fields of each matched product into *matches*."""
+    with profiler.stage("db.fetch_display_fields"):
+        display = load_display_fields(conn, [m["product_id"] for m in matches])
+    for m in matches:
+        m.update(display[m["product_id"]])
+    return matches
 
 
 # ---------- Filtering helpers ----------
@@ -206,34 +202,81 @@ def compute_score(product: Dict[str, Any], cust: Dict[str, Any]) -> float:
     return score
 
 
-def match_products(conn, customer: Dict[str, Any], top: int) -> List[Dict[str, Any]]:
-    products = fetch_products(conn, customer["requested_product_type"])
-    results: List[Dict[str, Any]] = []
-    for p in products:
-        ok, _ = passes_eligibility(p, customer)
-        if not ok:
-            continue
-        ok, _ = passes_underwriting(p, customer)
-        if not ok:
-            continue
-        ok, _ = passes_deal(p, customer)
-        if not ok:
-            continue
-        score = compute_score(p, customer)
-        results.append({
-            "bank": p["bank_name"],
-            "product_id": p["id"],
-            "score": round(score, 4),
-            "min_amount": p.get("min_loan_amount_usd"),
-            "max_amount": p.get("max_loan_amount_usd"),
-        })
-    results.sort(key=lambda r: r["score"], reverse=True)
+GATE_FILTERS = [
+    ("eligibility", passes_eligibility),
+    ("underwriting", passes_underwriting),
+    ("deal", passes_deal),
+]
+
+
+def _apply_gate(name: str, check, products: List[Dict[str, Any]], customer: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the products passing *check*, recording counters when profiling."""
+    prof = profiler.current()
+    if prof is None:
+        return [p for p in products if check(p, customer)[0]]
+    kept = []
+    with prof.stage(name):
+        for p in products:
+            ok, reason = check(p, customer)
+            if ok:
+                kept.append(p)
+            else:
+                prof.add_failure(name, check_name(reason))
+    prof.add_rows(name, len(products), len(kept))
+    return kept
+
+
+def rank_products(products: List[Dict[str, Any]], customer: Dict[str, Any], top: int) -> List[Dict[str, Any]]:
+    """Filter *products* through all gates and return the *top* by score."""
+    for name, check in GATE_FILTERS:
+        products = _apply_gate(name, check, products, customer)
+    with profiler.stage("scoring"):
+        results = [
+            {
+                "bank": p["bank_name"],
+                "product_id": p["id"],
+                "score": round(compute_score(p, customer), 4),
+                "min_amount": p.get("min_loan_amount_usd"),
+                "max_amount": p.get("max_loan_amount_usd"),
+            }
+            for p in products
+        ]
+    with profiler.stage("sorting"):
+        results.sort(key=lambda r: r["score"], reverse=True)
     return results[:top]
 
 
+def match_products(conn, customer: Dict[str, Any], top: int) -> List[Dict[str, Any]]:
+    """Rank the products of the customer's requested type; none without a type."""
+    product_type = customer.get("requested_product_type")
+    if product_type is None:
+        return []
+    with profiler.stage("db.fetch_products"):
+        products = fetch_product_criteria(conn, product_type)
+    return rank_products(products, customer, top)
+
+
+def print_near_miss(report: Dict[str, Any], as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+    print(f"{report['matched']} of {report['products']} product(s) match; "
+          f"{len(report['near_misses'])} near miss(es):")
+    for nm in report["near_misses"]:
+        gates = ", ".join(
+            g["gate"] if g["gap"] is None else f"{g['gate']} (gap {g['gap']})"
+            for g in nm["failed_gates"]
+        )
+        print(f"{nm['bank'][:30]:30} {nm['product_id']:10} {gates}")
+    if report["blockers"]:
+        print("Most common blockers:")
+        for b in report["blockers"]:
+            print(f"  {b['gate']:28} {b['products']:6} product(s), sole blocker for {b['sole_blocker']}")
+
+
 def main(argv: List[str] | None = None) -> None:
     ap = argparse.ArgumentParser(description="Match customer to bank products")
-    ap.add_argument("--dsn", required=True, help="Postgres DSN")
+    ap.add_argument("--dsn", help="Postgres DSN (optional with --snapshot and inline customer flags)")
     ap.add_argument("--customer-id", type=int)
     ap.add_argument("--state")
     ap.add_argument("--industry")
@@ -253,13 +296,74 @@ def main(argv: List[str] | None = None) -> None:
     ap.add_argument("--requested-amount", type=float, dest="requested_amount_usd")
     ap.add_argument("--use-of-proceeds")
     ap.add_argument("--top", type=int, default=5)
-    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--format", choices=["table", "json", "ndjson", "csv"], default="table",
+                    help="Output format; json/ndjson/csv rows are written as they are produced")
+    ap.add_argument("--json", action="store_const", const="json", dest="format", help="Same as --format json")
+    ap.add_argument("--customers-file",
+                    help="CSV or NDJSON of customer profiles (or customer_id column) to match in bulk")
+    ap.add_argument("--near-miss", action="store_true",
+                    help="Report products failing at most --max-failed gates and the gap to each threshold")
+    ap.add_argument("--max-failed", type=int, default=1)
+    ap.add_argument("--cache-db", help="SQLite file caching match results between runs")
+    ap.add_argument("--cache-ttl", type=float, default=300.0)
+    ap.add_argument("--profile", action="store_true",
+                    help="Print per-stage timings and gate counters to stderr")
+    ap.add_argument("--snapshot", help="Match against a catalog snapshot file instead of the DB")
+    ap.add_argument("--details", action="store_true",
+                    help="Add collateral, timeline and special-condition fields to the matches (needs --dsn)")
     args = ap.parse_args(argv)
 
-    conn = psycopg2.connect(args.dsn)
+    prof = profiler.enable() if args.profile else None
+
+    if not args.dsn and (args.customer_id or not args.snapshot):
+        raise SystemExit("--dsn is required unless --snapshot is used with inline customer flags")
+    if args.details and (not args.dsn or args.customers_file or args.near_miss):
+        raise SystemExit("--details needs --dsn and a single customer match")
+    conn = None
+    if args.dsn:
+        import psycopg2
+
+        conn = psycopg2.connect(args.dsn)
+    snapshot = None
+    if args.snapshot:
+        from etl.snapshot import open_snapshot, rank_catalog
+
+        with profiler.stage("snapshot.open"):
+            snapshot = open_snapshot(args.snapshot)
+
+    def rank(customer) -> List[Dict[str, Any]]:
+        if snapshot is not None:
+            with profiler.stage("snapshot.rank"):
+                return rank_catalog(snapshot.catalog(customer.get("requested_product_type")), customer, args.top)
+        return match_products(conn, customer, args.top)
+
+    if args.customers_file:
+        from etl.streaming import ROW_FIELDS, encode, iter_customer_rows, stream_matches, write_stream
+
+        def match_item(item: Dict[str, Any]) -> List[Dict[str, Any]]:
+            if item.get("customer_id") is None:
+                customer = CustomerProfile(**item)
+            elif conn is None:
+                raise ValueError("customer_id rows require --dsn")
+            else:
+                with profiler.stage("db.fetch_customer"):
+                    customer = fetch_customer_profile(conn, int(item["customer_id"]))
+            if not customer.get("requested_product_type"):
+                raise ValueError("requested_product_type is required")
+            return rank(customer)
+
+        rows = stream_matches(iter_customer_rows(args.customers_file), match_item)
+        fmt = "ndjson" if args.format == "table" else args.format
+        write_stream(encode(rows, fmt, ROW_FIELDS), sys.stdout)
+        if conn is not None:
+            conn.close()
+        if prof is not None:
+            print(prof.summary(), file=sys.stderr)
+        return
 
     if args.customer_id:
-        customer = fetch_customer(conn, args.customer_id)
+        with profiler.stage("db.fetch_customer"):
+            customer = fetch_customer_profile(conn, args.customer_id)
     else:
         required = [
             "state", "industry", "entity_type", "years_in_business",
@@ -269,7 +373,7 @@ def main(argv: List[str] | None = None) -> None:
         missing = [f for f in required if getattr(args, f) is None]
         if missing:
             raise SystemExit(f"Missing required flags: {', '.join(missing)}")
-        customer = {
+        customer = CustomerProfile(**{
             "state": args.state,
             "industry": args.industry,
             "entity_type": args.entity_type,
@@ -287,12 +391,51 @@ def main(argv: List[str] | None = None) -> None:
             "requested_product_type": args.requested_product_type,
             "requested_amount_usd": args.requested_amount_usd,
             "use_of_proceeds": args.use_of_proceeds,
-        }
+        })
 
-    matches = match_products(conn, customer, args.top)
+    if args.near_miss:
+        from etl.near_miss import analyze, analyze_catalog
+
+        with profiler.stage("near_miss"):
+            if snapshot is not None:
+                report = analyze_catalog(snapshot.catalog(customer.get("requested_product_type")),
+                                         customer, args.max_failed)
+            else:
+                product_type = customer.get("requested_product_type")
+                with profiler.stage("db.fetch_products"):
+                    products = fetch_product_criteria(conn, product_type) if product_type else []
+                report = analyze(products, customer, args.max_failed)
+        report["near_misses"] = report["near_misses"][:args.top]
+        print_near_miss(report, args.format != "table")
+        if conn is not None:
+            conn.close()
+        if prof is not None:
+            print(prof.summary(), file=sys.stderr)
+        return
+
+    def compute() -> List[Dict[str, Any]]:
+        return rank(customer)
+
+    catalog_version = snapshot.catalog_version if snapshot is not None else None
+
+    if args.cache_db:
+        from etl.match_cache import MatchCache, cached_call, fetch_catalog_version
+
+        if catalog_version is None:
+            catalog_version = fetch_catalog_version(conn)
+        cache = MatchCache(ttl=args.cache_ttl, path=args.cache_db)
+        matches = cached_call(cache, customer, args.top, catalog_version, compute)
+        print(f"cache: {cache.stats()}", file=sys.stderr)
+        cache.close()
+    else:
+        matches = compute()
+    if args.details:
+        add_display_fields(conn, matches)
+
+    if args.format != "table":
+        from etl.streaming import encode, write_stream
 
-    if args.json:
-        print(json.dumps(matches, indent=2))
+        write_stream(encode(matches, args.format), sys.stdout)
     else:
         if not matches:
             print("No matches found")
@@ -302,8 +445,14 @@ def main(argv: List[str] | None = None) -> None:
             for m in matches:
                 rng = f"{m['min_amount']} - {m['max_amount']}"
                 print(f"{m['bank'][:30]:30} {m['product_id']:10} {m['score']:<6} {rng}")
-
-    conn.close()
+                if args.details:
+                    details = ", ".join(f"{f}={m[f]}" for f in PRODUCT_DISPLAY_FIELDS if m.get(f) is not None)
+                    print(f"    {details or 'no details on file'}")
+
+    if conn is not None:
+        conn.close()
+    if prof is not None:
+        print(prof.summary(), file=sys.stderr)
 
 
 if __name__ == "__main__":
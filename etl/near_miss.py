@@ -0,0 +1,154 @@
+"""Near-miss and what-if analysis across the whole product catalog.
+
+The ``passes_*`` filters in ``match_customer`` stop at the first failing gate.
+This module evaluates *every* gate for *every* product at once on a
+:class:`~etl.catalog.ColumnarCatalog`, and reports for each product the gates
+it fails together with the numeric gap to each threshold (e.g. "FICO needs
++20", "requested amount must drop by 50,000"). It also aggregates the most
+common blockers across the catalog.
+
+The gates mirror ``passes_eligibility``, ``passes_underwriting`` and
+``passes_deal`` one-to-one and reuse their reason strings.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from etl.catalog import ColumnarCatalog
+from etl.gates import GATES, Gate
+
+# Deal gates are skipped when the customer gives no requested amount
+_OPTIONAL_VALUE_GATES = {"amount_min", "amount_max"}
+
+
+def _customer_number(customer: Dict[str, Any], field: str) -> Optional[float]:
+    value = customer.get(field)
+    return None if value is None else float(value)
+
+
+def evaluate_gates(catalog: ColumnarCatalog, customer: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Evaluate all :data:`GATES` for every product in *catalog*.
+
+    Returns ``(failed, gaps)``, both shaped ``(len(GATES), len(catalog))``.
+    ``failed[g, p]`` is True when product ``p`` fails gate ``g``. ``gaps``
+    holds the non-negative distance to the threshold for failed numeric gates
+    and ``NaN`` elsewhere.
+    """
+    n = len(catalog)
+    failed = np.zeros((len(GATES), n), dtype=bool)
+    gaps = np.full((len(GATES), n), np.nan)
+    for g, gate in enumerate(GATES):
+        if gate.kind in ("min", "max"):
+            value = _customer_number(customer, gate.customer_field)
+            if value is None:
+                if gate.name in _OPTIONAL_VALUE_GATES:
+                    continue
+                value = 0.0
+            threshold = catalog.numeric[gate.product_field]
+            with np.errstate(invalid="ignore"):
+                diff = threshold - value if gate.kind == "min" else value - threshold
+                mask = diff > 0  # NaN thresholds compare False
+            failed[g] = mask
+            gaps[g, mask] = diff[mask]
+        elif gate.kind == "allowed":
+            value = customer.get(gate.customer_field)
+            failed[g] = catalog.has_list(gate.product_field) & ~catalog.list_contains(gate.product_field, value)
+        elif gate.kind == "excluded":
+            value = customer.get(gate.customer_field)
+            failed[g] = catalog.list_contains(gate.product_field, value)
+        else:  # flag
+            required = catalog.flags[gate.product_field]
+            if gate.customer_field and customer.get(gate.customer_field):
+                continue
+            failed[g] = required
+    return failed, gaps
+
+
+def _gate_report(gate: Gate, threshold: Optional[float], value: Any, gap: float) -> Dict[str, Any]:
+    return {
+        "gate": gate.name,
+        "stage": gate.stage,
+        "reason": gate.reason,
+        "threshold": threshold,
+        "value": value,
+        "gap": None if np.isnan(gap) else round(float(gap), 4),
+    }
+
+
+def near_misses(
+    catalog: ColumnarCatalog,
+    customer: Dict[str, Any],
+    max_failed: int = 1,
+    failed: Optional[np.ndarray] = None,
+    gaps: Optional[np.ndarray] = None,
+) -> List[Dict[str, Any]]:
+    """Return products failing between 1 and *max_failed* gates.
+
+    Each entry lists the failing gates with their thresholds and gaps. Results
+    are ordered by number of failing gates, then product id.
+    """
+    if failed is None or gaps is None:
+        failed, gaps = evaluate_gates(catalog, customer)
+    counts = failed.sum(axis=0)
+    selected = np.flatnonzero((counts >= 1) & (counts <= max_failed))
+    selected = selected[np.lexsort((catalog.ids[selected], counts[selected]))]
+    results: List[Dict[str, Any]] = []
+    for p in selected:
+        gates = []
+        for g in np.flatnonzero(failed[:, p]):
+            gate = GATES[g]
+            threshold = None
+            if gate.kind in ("min", "max"):
+                threshold = float(catalog.numeric[gate.product_field][p])
+            value = customer.get(gate.customer_field) if gate.customer_field else None
+            gates.append(_gate_report(gate, threshold, value, gaps[g, p]))
+        results.append({
+            "bank": catalog.bank_names[p],
+            "product_id": int(catalog.ids[p]),
+            "failed_gates": gates,
+        })
+    return results
+
+
+def blocker_summary(failed: np.ndarray, gaps: np.ndarray) -> List[Dict[str, Any]]:
+    """Aggregate blockers across the catalog, most common first.
+
+    For each gate reports how many products it blocks, how many it blocks on
+    its own (fixing that gate alone would qualify the customer) and the
+    smallest gap that unlocks one of those sole-blocked products.
+    """
+    sole = failed & (failed.sum(axis=0) == 1)
+    summary: List[Dict[str, Any]] = []
+    for g, gate in enumerate(GATES):
+        blocked = int(failed[g].sum())
+        if not blocked:
+            continue
+        sole_gaps = gaps[g, sole[g]]
+        sole_gaps = sole_gaps[~np.isnan(sole_gaps)]
+        summary.append({
+            "gate": gate.name,
+            "stage": gate.stage,
+            "products": blocked,
+            "sole_blocker": int(sole[g].sum()),
+            "min_gap_to_unlock": round(float(sole_gaps.min()), 4) if sole_gaps.size else None,
+        })
+    summary.sort(key=lambda s: (-s["products"], -s["sole_blocker"]))
+    return summary
+
+
+def analyze(products: List[Dict[str, Any]], customer: Dict[str, Any], max_failed: int = 1) -> Dict[str, Any]:
+    """Run the full near-miss analysis for *customer* against *products*."""
+    return analyze_catalog(ColumnarCatalog.from_products(products), customer, max_failed)
+
+
+def analyze_catalog(catalog: ColumnarCatalog, customer: Dict[str, Any], max_failed: int = 1) -> Dict[str, Any]:
+    """:func:`analyze` for an already built (or snapshot-backed) catalog."""
+    failed, gaps = evaluate_gates(catalog, customer)
+    return {
+        "products": len(catalog),
+        "matched": int((~failed.any(axis=0)).sum()),
+        "near_misses": near_misses(catalog, customer, max_failed, failed, gaps),
+        "blockers": blocker_summary(failed, gaps),
+    }
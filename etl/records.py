@@ -0,0 +1,265 @@
+"""Compact, pre-converted product and customer records for matching.
+
+Product rows straight from the database are dicts with ~40 keys, ``Decimal``
+numbers and comma-separated strings that the filters re-parse on every call.
+:class:`ProductCriteria` and :class:`CustomerProfile` keep only the fields
+matching reads, converted once at load time: numbers to ``float`` (``None``
+for "no limit"), lists to ``frozenset`` and flags to ``bool``. Both use
+``__slots__`` so a large catalog costs a fraction of the dict memory.
+
+Display-only product fields (collateral details, timelines, special
+conditions) are not part of the matching query; :func:`load_display_fields`
+reads them for the few products actually shown. Records built with
+:meth:`ProductCriteria.from_row` from full rows keep them in ``display``.
+
+The records support ``record.get(name, default)`` and ``record[name]`` so the
+``passes_*`` filters, ``compute_score`` and the columnar catalog accept them
+in place of row dicts.
+"""
+from __future__ import annotations
+
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+# Product fields holding numeric thresholds
+PRODUCT_NUMERIC_FIELDS = (
+    "min_loan_amount_usd", "max_loan_amount_usd",
+    "min_years_in_business", "min_annual_revenue_usd",
+    "min_personal_credit_score", "min_business_credit_score", "min_dscr",
+    "min_current_ratio", "max_debt_to_equity",
+    "negative_balance_days_avg", "negative_balance_longest_streak",
+    "negative_balance_max_overdraft_usd",
+)
+
+# Product fields holding comma-separated lists
+PRODUCT_LIST_FIELDS = (
+    "allowed_entities", "allowed_industries", "excluded_industries",
+    "geographic_footprint", "excluded_states", "bank_footprint",
+    "deal_purpose_allowed",
+)
+
+PRODUCT_FLAG_FIELDS = ("requires_existing_relationship", "cashflow_positive_required")
+
+# Display-only product fields, loaded on demand
+PRODUCT_DISPLAY_FIELDS = (
+    "collateral_required", "eligible_collateral_types",
+    "max_ltv_real_estate", "max_ltv_equipment",
+    "max_ltv_receivables", "max_ltv_inventory",
+    "personal_guarantee", "guarantee_type",
+    "decision_timeline_prequal_days", "decision_timeline_underwriting_days",
+    "average_time_to_fund_days", "special_conditions",
+)
+
+CUSTOMER_NUMERIC_FIELDS = (
+    "years_in_business", "annual_revenue_usd",
+    "personal_credit_score", "business_credit_score", "dscr",
+    "current_ratio", "debt_to_equity",
+    "negative_balance_days_avg", "negative_balance_longest_streak",
+    "negative_balance_max_overdraft_usd", "requested_amount_usd",
+)
+
+CUSTOMER_TEXT_FIELDS = (
+    "entity_type", "industry", "state", "requested_product_type", "use_of_proceeds",
+)
+
+# Customer fields read by the gates and scoring
+CUSTOMER_MATCH_FIELDS = CUSTOMER_TEXT_FIELDS + CUSTOMER_NUMERIC_FIELDS + ("cashflow_positive",)
+
+
+def parse_csv(value: Any) -> Any:
+    """Split comma-separated strings into a list of trimmed tokens.
+
+    Already parsed ``frozenset`` values (from :class:`ProductCriteria`) are
+    returned unchanged.
+    """
+    if isinstance(value, frozenset):
+        return value
+    if not value:
+        return []
+    return [v.strip() for v in str(value).split(",") if v.strip()]
+
+
+def _float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+# Catalogs repeat the same few lists (state footprints, excluded industries)
+# thousands of times, so parsed sets are shared between records.
+_INTERNED_SETS: Dict[frozenset, frozenset] = {}
+
+
+def _set(value: Any) -> frozenset:
+    parsed = frozenset(parse_csv(value))
+    return _INTERNED_SETS.setdefault(parsed, parsed)
+
+
+_EMPTY_SET = _set(None)
+
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else sys.intern(str(value))
+
+
+class _Record:
+    __slots__ = ()
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Dict-style access; ``None`` values count as missing."""
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if not name.startswith("_")}
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ProductCriteria(_Record):
+    """Matching criteria of one product."""
+
+    __slots__ = (
+        ("id", "bank_name", "product_type")
+        + PRODUCT_NUMERIC_FIELDS + PRODUCT_LIST_FIELDS + PRODUCT_FLAG_FIELDS
+        + ("display",)
+    )
+
+    def __init__(self, **fields: Any):
+        self.id = fields.get("id")
+        self.bank_name = _text(fields.get("bank_name") or "")
+        self.product_type = _text(fields.get("product_type"))
+        for f in PRODUCT_NUMERIC_FIELDS:
+            setattr(self, f, _float(fields.get(f)))
+        for f in PRODUCT_LIST_FIELDS:
+            setattr(self, f, _set(fields.get(f)))
+        for f in PRODUCT_FLAG_FIELDS:
+            setattr(self, f, bool(fields.get(f)))
+        # Display-only fields, set by from_row() when the row carries them
+        self.display: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "ProductCriteria":
+        """Build from a full product row dict."""
+        record = cls(**row)
+        if any(f in row for f in PRODUCT_DISPLAY_FIELDS):
+            record.display = {f: row.get(f) for f in PRODUCT_DISPLAY_FIELDS}
+        return record
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = getattr(self, name, None)
+        if value is None and self.display is not None:
+            value = self.display.get(name)
+        return default if value is None or value is _EMPTY_SET else value
+
+
+class CustomerProfile(_Record):
+    """Customer attributes read by the matching gates and scoring."""
+
+    __slots__ = ("id", "legal_name") + CUSTOMER_MATCH_FIELDS
+
+    def __init__(self, **fields: Any):
+        self.id = fields.get("id")
+        self.legal_name = fields.get("legal_name")
+        for f in CUSTOMER_TEXT_FIELDS:
+            setattr(self, f, _text(fields.get(f)))
+        for f in CUSTOMER_NUMERIC_FIELDS:
+            setattr(self, f, _float(fields.get(f)))
+        self.cashflow_positive = bool(fields.get("cashflow_positive"))
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "CustomerProfile":
+        return cls(**row)
+
+
+# ---------- Loading from Postgres ----------
+
+PRODUCT_CRITERIA_SELECT = """
+    SELECT p.id, b.legal_name AS bank_name, p.product_type,
+           p.min_loan_amount_usd, p.max_loan_amount_usd,
+           b.lending_footprint AS bank_footprint,
+           e.allowed_entities, e.allowed_industries, e.excluded_industries,
+           e.geographic_footprint, e.excluded_states,
+           e.min_years_in_business, e.min_annual_revenue_usd,
+           e.requires_existing_relationship,
+           u.min_personal_credit_score, u.min_business_credit_score, u.min_dscr,
+           u.min_current_ratio, u.max_debt_to_equity, u.cashflow_positive_required,
+           u.negative_balance_days_avg, u.negative_balance_longest_streak,
+           u.negative_balance_max_overdraft_usd,
+           c.purpose_allowed AS deal_purpose_allowed
+    FROM products p
+    JOIN banks b ON p.bank_id = b.id
+    LEFT JOIN product_eligibility e ON e.product_id = p.id
+    LEFT JOIN product_underwriting u ON u.product_id = p.id
+    LEFT JOIN product_collateral c ON c.product_id = p.id
+"""
+
+
+def fetch_product_criteria(conn, product_type: str) -> List[ProductCriteria]:
+    """Load the products of *product_type* as :class:`ProductCriteria`.
+
+    Only matching columns are selected; see :func:`load_display_fields`.
+    """
+    if product_type is None:
+        raise ValueError("product_type is required; use fetch_all_product_criteria")
+    cur = conn.cursor()
+    cur.execute(PRODUCT_CRITERIA_SELECT + " WHERE p.product_type = %s", (product_type,))
+    return _criteria(cur)
+
+
+def fetch_all_product_criteria(conn) -> List[ProductCriteria]:
+    """Load every product, ordered by type and id (for catalog snapshots)."""
+    cur = conn.cursor()
+    cur.execute(PRODUCT_CRITERIA_SELECT + " ORDER BY p.product_type, p.id")
+    return _criteria(cur)
+
+
+def _criteria(cur) -> List[ProductCriteria]:
+    names = [d[0] for d in cur.description]
+    records = [ProductCriteria(**dict(zip(names, row))) for row in cur.fetchall()]
+    cur.close()
+    return records
+
+
+def load_display_fields(conn, product_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Return the display-only fields of *product_ids* (one query).
+
+    Products without a ``product_collateral`` row get all-``None`` fields.
+    """
+    ids = list(dict.fromkeys(product_ids))
+    fields: Dict[int, Dict[str, Any]] = {i: dict.fromkeys(PRODUCT_DISPLAY_FIELDS) for i in ids}
+    if not ids:
+        return fields
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT product_id, " + ", ".join(PRODUCT_DISPLAY_FIELDS)
+        + " FROM product_collateral WHERE product_id = ANY(%s)",
+        (ids,),
+    )
+    for row in cur.fetchall():
+        fields[row[0]] = {
+            f: (float(v) if isinstance(v, Decimal) else v)
+            for f, v in zip(PRODUCT_DISPLAY_FIELDS, row[1:])
+        }
+    cur.close()
+    return fields
+
+
+def fetch_customer_profile(conn, customer_id: int) -> CustomerProfile:
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM customer_profiles WHERE id = %s", (customer_id,))
+    row = cur.fetchone()
+    if not row:
+        raise SystemExit(f"Customer id {customer_id} not found")
+    names = [d[0] for d in cur.description]
+    cur.close()
+    return CustomerProfile(**dict(zip(names, row)))
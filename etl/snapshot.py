@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""Versioned, memory-mappable snapshot of the matchable product catalog.
+
+Every process used to rebuild the catalog from Postgres at startup. Instead,
+``ingest_csv --snapshot`` (or this script) exports the catalog once to a
+single file and matchers open it with :func:`open_snapshot`, which ``mmap``s
+the file: startup is a file open plus a small JSON header parse, and all
+worker processes on a host share the same page-cache copy of the arrays.
+
+File layout (all integers little-endian)::
+
+    8 bytes   magic ``BMCATSNP``
+    4 bytes   format version (uint32)
+    4 bytes   reserved
+    8 bytes   header length (uint64)
+    N bytes   JSON header: catalog version, row count, product type ranges,
+              array directory (dtype/offset/shape) and list vocabularies
+    ...       arrays, each aligned to 64 bytes
+
+Rows are sorted by ``(product_type, id)`` so each product type is a
+contiguous range and :meth:`CatalogSnapshot.catalog` can return zero-copy
+slices. Columns mirror :class:`~etl.catalog.ColumnarCatalog`: ``float64``
+thresholds, ``bool`` flags, ``int32`` dictionary codes plus a ``uint8``
+bitset matrix per list criterion (the vocabularies live in the header) and
+bank names in a string table (``int64`` offsets into a UTF-8 blob).
+
+Usage:
+    python etl/snapshot.py --dsn postgres://... --out data/catalog.snap
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+if __package__ in (None, ""):
+    # Allow ``python etl/snapshot.py`` to import the repo's ``etl`` package
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from etl.catalog import FLAG_FIELDS, LIST_FIELDS, NUMERIC_FIELDS, ColumnarCatalog, ListDictionary
+from etl.match_customer import W_AMOUNT, W_DSCR, W_FICO, W_NEG_DAYS
+from src.observability import profiler
+
+MAGIC = b"BMCATSNP"
+FORMAT_VERSION = 1
+_PREAMBLE = struct.Struct("<8sII Q")
+_ALIGN = 64
+
+
+class StringTable(Sequence[str]):
+    """Read-only strings stored as offsets into a UTF-8 blob."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def encode(cls, values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("StringTable only supports contiguous slices")
+            return StringTable(self.offsets[start:stop + 1], self.data)
+        if index < 0:
+            index += len(self)
+        lo, hi = int(self.offsets[index]), int(self.offsets[index + 1])
+        return self.data[lo:hi].tobytes().decode("utf-8")
+
+
+def _pad(f: BinaryIO) -> None:
+    f.write(b"\0" * (-f.tell() % _ALIGN))
+
+
+def write_snapshot(products: List[Dict[str, Any]], path: str, catalog_version: int = 0) -> int:
+    """Write *products* (row dicts or :class:`ProductCriteria`) to *path*.
+
+    The file is written to a temporary name and atomically renamed, so readers
+    never observe a partial snapshot. Returns the number of rows written.
+    """
+    products = sorted(products, key=lambda p: (str(p.get("product_type") or ""), p["id"]))
+    catalog = ColumnarCatalog.from_products(products)
+
+    ranges: Dict[str, List[int]] = {}
+    for i, p in enumerate(products):
+        ptype = str(p.get("product_type") or "")
+        ranges.setdefault(ptype, [i, i])[1] = i + 1
+
+    arrays: Dict[str, np.ndarray] = {"ids": catalog.ids}
+    names_offsets, names_data = StringTable.encode(list(catalog.bank_names))
+    arrays["bank_names.offsets"] = names_offsets
+    arrays["bank_names.data"] = names_data
+    for f in NUMERIC_FIELDS:
+        arrays[f"numeric.{f}"] = catalog.numeric[f]
+    for f in FLAG_FIELDS:
+        arrays[f"flags.{f}"] = catalog.flags[f]
+    for f in LIST_FIELDS:
+        codes, dictionary = catalog.lists[f]
+        arrays[f"codes.{f}"] = codes
+        arrays[f"bits.{f}"] = dictionary.bits
+
+    # Lay out arrays after the header; offsets are relative to the data start
+    directory: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        offset += -offset % _ALIGN
+        directory[name] = {"dtype": arr.dtype.str, "offset": offset, "shape": list(arr.shape)}
+        offset += arr.nbytes
+
+    header = {
+        "catalog_version": int(catalog_version),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "rows": len(catalog),
+        "product_types": ranges,
+        "arrays": directory,
+        "vocabularies": {f: catalog.lists[f][1].vocabulary for f in LIST_FIELDS},
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header_bytes)))
+        f.write(header_bytes)
+        _pad(f)
+        data_start = f.tell()
+        for name, arr in arrays.items():
+            f.write(b"\0" * (data_start + directory[name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(arr).tobytes())
+    os.replace(tmp, path)
+    return len(catalog)
+
+
+class CatalogSnapshot:
+    """A snapshot file opened with ``mmap``; arrays are zero-copy views."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION})")
+        start = _PREAMBLE.size
+        header = json.loads(self._mmap[start:start + header_len].decode("utf-8"))
+        data_start = start + header_len
+        data_start += -data_start % _ALIGN
+
+        self.catalog_version: int = header["catalog_version"]
+        self.created_at: str = header["created_at"]
+        self.rows: int = header["rows"]
+        self.product_types: Dict[str, Tuple[int, int]] = {
+            k: (v[0], v[1]) for k, v in header["product_types"].items()
+        }
+
+        def array(name: str) -> np.ndarray:
+            spec = header["arrays"][name]
+            shape = tuple(spec["shape"])
+            flat = np.frombuffer(self._mmap, dtype=np.dtype(spec["dtype"]),
+                                 count=int(np.prod(shape)), offset=data_start + spec["offset"])
+            return flat.reshape(shape)
+
+        dictionaries = {
+            f: ListDictionary(header["vocabularies"][f], array(f"bits.{f}")) for f in LIST_FIELDS
+        }
+        self._catalog = ColumnarCatalog(
+            array("ids"),
+            StringTable(array("bank_names.offsets"), array("bank_names.data")),
+            {f: array(f"numeric.{f}") for f in NUMERIC_FIELDS},
+            {f: (array(f"codes.{f}"), dictionaries[f]) for f in LIST_FIELDS},
+            {f: array(f"flags.{f}") for f in FLAG_FIELDS},
+        )
+
+    def catalog(self, product_type: Optional[str]) -> ColumnarCatalog:
+        """Return the rows of one *product_type*.
+
+        Like ``fetch_product_criteria``, a missing type matches nothing, so a
+        customer without one cannot be ranked against the whole catalog.
+        """
+        start, end = self.product_types.get(product_type, (0, 0)) if product_type else (0, 0)
+        return self._catalog.slice(start, end)
+
+    def catalog_all(self) -> ColumnarCatalog:
+        """Return every product of the snapshot."""
+        return self._catalog
+
+    def close(self) -> None:
+        # Views into the mmap must be released before it can be closed
+        self._catalog = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # arrays still referenced elsewhere; the OS unmaps on exit
+
+    def __enter__(self) -> "CatalogSnapshot":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def open_snapshot(path: str) -> CatalogSnapshot:
+    return CatalogSnapshot(path)
+
+
+# ---------- Matching against a columnar catalog ----------
+
+def score_catalog(catalog: ColumnarCatalog, customer: Dict[str, Any]) -> np.ndarray:
+    """Vectorized ``match_customer.compute_score`` for every product."""
+    score = np.zeros(len(catalog))
+    num = catalog.numeric
+
+    def term(threshold: np.ndarray, value: Any, fn) -> None:
+        if value is None:
+            return
+        valid = ~np.isnan(threshold)
+        score[valid] += fn(threshold[valid], float(value))
+
+    term(num["min_personal_credit_score"], customer.get("personal_credit_score"),
+         lambda t, v: W_FICO * (v - t) / 100.0)
+    term(num["min_dscr"], customer.get("dscr"), lambda t, v: W_DSCR * (v - t))
+    term(num["negative_balance_days_avg"], customer.get("negative_balance_days_avg"),
+         lambda t, v: W_NEG_DAYS * (t - v) / np.maximum(t, 1))
+
+    req = customer.get("requested_amount_usd")
+    if req is not None:
+        lo, hi = num["min_loan_amount_usd"], num["max_loan_amount_usd"]
+        with np.errstate(invalid="ignore"):
+            valid = hi > lo  # False where either bound is NaN
+        mid = (hi[valid] + lo[valid]) / 2.0
+        half = (hi[valid] - lo[valid]) / 2.0
+        fit = 1 - np.abs(float(req) - mid) / half
+        score[valid] += W_AMOUNT * np.maximum(fit, 0)
+    return score
+
+
+def _record_gate_counters(prof, failed: np.ndarray) -> None:
+    """Record the counters ``rank_products`` would for the same products.
+
+    The row filters stop at the first failing gate, so each rejected product
+    counts once: against its first failing gate, in its stage.
+    """
+    from etl.gates import GATES
+
+    rejected = failed.any(axis=0)
+    first = np.argmax(failed, axis=0)[rejected]
+    per_gate = np.bincount(first, minlength=len(GATES))
+    remaining = failed.shape[1]
+    for stage in ("eligibility", "underwriting", "deal"):
+        dropped = 0
+        for g, gate in enumerate(GATES):
+            if gate.stage == stage and per_gate[g]:
+                prof.add_failure(stage, gate.name, int(per_gate[g]))
+                dropped += int(per_gate[g])
+        prof.add_rows(stage, remaining, remaining - dropped)
+        remaining -= dropped
+
+
+def rank_catalog(catalog: ColumnarCatalog, customer: Dict[str, Any], top: int) -> List[Dict[str, Any]]:
+    """Columnar equivalent of ``match_customer.rank_products``."""
+    from etl.near_miss import evaluate_gates
+
+    prof = profiler.current()
+    with profiler.stage("snapshot.gates"):
+        failed, _ = evaluate_gates(catalog, customer)
+    if prof is not None:
+        _record_gate_counters(prof, failed)
+    passing = np.flatnonzero(~failed.any(axis=0))
+    with profiler.stage("scoring"):
+        scores = np.round(score_catalog(catalog, customer)[passing], 4)
+    with profiler.stage("sorting"):
+        order = passing[np.argsort(-scores, kind="stable")][:top]
+    lo, hi = catalog.numeric["min_loan_amount_usd"], catalog.numeric["max_loan_amount_usd"]
+    ranked = dict(zip(passing.tolist(), scores.tolist()))
+    return [
+        {
+            "bank": catalog.bank_names[p],
+            "product_id": int(catalog.ids[p]),
+            "score": ranked[p],
+            "min_amount": None if np.isnan(lo[p]) else float(lo[p]),
+            "max_amount": None if np.isnan(hi[p]) else float(hi[p]),
+        }
+        for p in order.tolist()
+    ]
+
+
+def export_snapshot(conn, path: str) -> int:
+    """Export the current database catalog to *path*; returns rows written.
+
+    The version and the products are read in one ``REPEATABLE READ`` read-only
+    transaction, so an ingest committing meanwhile cannot label old rows with
+    its new version. *conn* must not be inside a transaction.
+    """
+    from etl.match_cache import fetch_catalog_version
+    from etl.records import fetch_all_product_criteria
+
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        cur = conn.cursor()
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        cur.close()
+        version = fetch_catalog_version(conn)
+        products = fetch_all_product_criteria(conn)
+    finally:
+        conn.rollback()
+        conn.autocommit = autocommit
+    return write_snapshot(products, path, version)
+
+
+def main(argv: List[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Export the product catalog to a snapshot file")
+    ap.add_argument("--dsn", required=True, help="Postgres DSN")
+    ap.add_argument("--out", required=True, help="Snapshot file to write")
+    args = ap.parse_args(argv)
+
+    import psycopg2
+
+    conn = psycopg2.connect(args.dsn)
+    rows = export_snapshot(conn, args.out)
+    conn.close()
+    print(f"Wrote {rows} products to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Incremental reading of customer files and writing of match results.
+
+Bulk exports can reach millions of (customer, product, score) rows, so
+nothing here builds the whole output: customers are read one line at a time,
+and results are encoded as text chunks by generators. These generators feed
+``match_customer --format`` (see :func:`write_stream`) and FastAPI
+``StreamingResponse`` alike.
+
+JSON is encoded with ``orjson`` when it is installed and with the standard
+library otherwise.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    import orjson
+except ImportError:  # optional faster encoder
+    orjson = None
+
+from etl.records import CUSTOMER_NUMERIC_FIELDS
+
+# Columns of a flattened (customer, product, score) result row
+ROW_FIELDS = ("customer_id", "row", "rank", "bank", "product_id", "score",
+              "min_amount", "max_amount", "error")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "json": "application/json",
+}
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+
+# Exceptions caused by one customer's data (bad values, unknown id) rather
+# than by the matcher; they become error rows instead of stopping a stream.
+ROW_ERRORS = (ValueError, TypeError, KeyError, SystemExit)
+
+
+def _json_default(value: Any) -> Any:
+    return float(value) if isinstance(value, Decimal) else str(value)
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> str:
+        """Compact JSON encoding of *obj* (``Decimal`` as float)."""
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), default=_json_default)
+
+    def dumps(obj: Any) -> str:
+        """Compact JSON encoding of *obj* (``Decimal`` as float)."""
+        return _encoder.encode(obj)
+
+
+# ---------- Reading customers ----------
+
+def normalize_customer(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize one uploaded row: blanks to None, typed numbers and booleans."""
+    out: Dict[str, Any] = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if value == "":
+                value = None
+        out[key.strip()] = value
+    for f in CUSTOMER_NUMERIC_FIELDS:
+        if out.get(f) is not None:
+            try:
+                out[f] = float(out[f])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid number for {f}: {out[f]!r}")
+    flag = out.get("cashflow_positive")
+    if isinstance(flag, str):
+        out["cashflow_positive"] = flag.lower() in _TRUE
+    return out
+
+
+RawRow = Union[Dict[str, Any], ValueError]
+
+
+def _raw_csv(lines: Iterable[str]) -> Iterator[RawRow]:
+    yield from csv.DictReader(lines)
+
+
+def _raw_ndjson(lines: Iterable[str]) -> Iterator[RawRow]:
+    """Yield decoded objects; undecodable lines yield a ``ValueError``."""
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield ValueError(f"Invalid JSON on line {lineno}: {exc}")
+            continue
+        yield row if isinstance(row, dict) else ValueError(f"Line {lineno} is not an object")
+
+
+def _normalized(rows: Iterable[RawRow]) -> Iterator[Dict[str, Any]]:
+    for row in rows:
+        if isinstance(row, ValueError):
+            raise row
+        yield normalize_customer(row)
+
+
+def iter_customers_csv(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    return _normalized(_raw_csv(lines))
+
+
+def iter_customers_ndjson(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    return _normalized(_raw_ndjson(lines))
+
+
+def iter_customer_rows(path: str) -> Iterator[RawRow]:
+    """Yield raw rows of a ``.csv`` or NDJSON file, one at a time.
+
+    Rows are not normalized, and unreadable lines come back as ``ValueError``
+    instances, so :func:`stream_matches` can report each bad row and go on.
+    """
+    reader = _raw_csv if path.lower().endswith(".csv") else _raw_ndjson
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        yield from reader(fh)
+
+
+# ---------- Result rows ----------
+
+def result_rows(ref: Dict[str, Any], matches: Optional[List[Dict[str, Any]]],
+                error: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Flatten one customer's matches into ``ROW_FIELDS``-style rows.
+
+    *ref* identifies the customer (``{"customer_id": ...}`` or ``{"row": ...}``).
+    An error yields a single row carrying it, and a customer without matches
+    yields the bare *ref*, so every customer appears in the output.
+    """
+    if error is not None:
+        yield dict(ref, error=error)
+        return
+    if not matches:
+        yield dict(ref)
+        return
+    for rank, match in enumerate(matches or (), 1):
+        row = dict(ref, rank=rank)
+        row.update(match)
+        yield row
+
+
+def rows_from_ndjson(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Flatten per-customer NDJSON result lines (as stored by batch jobs)."""
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        ref = {k: record[k] for k in ("customer_id", "row") if k in record}
+        yield from result_rows(ref, record.get("matches"), record.get("error"))
+
+
+# ---------- Encoders ----------
+
+def iter_ndjson(items: Iterable[Any]) -> Iterator[str]:
+    for item in items:
+        yield dumps(item) + "\n"
+
+
+def iter_json(items: Iterable[Any]) -> Iterator[str]:
+    """Encode *items* as a JSON array, one element per line."""
+    first = True
+    for item in items:
+        yield ("[\n" if first else ",\n") + dumps(item)
+        first = False
+    yield "[]\n" if first else "\n]\n"
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], fields: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Encode dict rows as CSV, header first.
+
+    Columns default to the keys of the first row; unknown keys are dropped and
+    nested values are written as JSON.
+    """
+    buf = io.StringIO()
+    writer: Optional[csv.DictWriter] = None
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buf, fieldnames=list(fields or row), extrasaction="ignore",
+                                    lineterminator="\n")
+            writer.writeheader()
+        writer.writerow({k: dumps(v) if isinstance(v, (dict, list)) else v for k, v in row.items()})
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if writer is None and fields:
+        yield ",".join(fields) + "\n"
+
+
+def encode(items: Iterable[Any], fmt: str, fields: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """Return a text-chunk generator for *items* in ``ndjson``, ``csv`` or ``json``."""
+    if fmt == "ndjson":
+        return iter_ndjson(items)
+    if fmt == "json":
+        return iter_json(items)
+    if fmt == "csv":
+        return iter_csv(items, fields)
+    raise ValueError(f"Unknown output format: {fmt}")
+
+
+def write_stream(chunks: Iterable[str], out: IO[str], flush_every: int = 1000) -> int:
+    """Write *chunks* to *out* as they are produced; returns the chunk count."""
+    count = 0
+    for count, chunk in enumerate(chunks, 1):
+        out.write(chunk)
+        if count % flush_every == 0:
+            out.flush()
+    out.flush()
+    return count
+
+
+def stream_matches(rows: Iterable[RawRow],
+                   match: Callable[[Any], List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """Normalize and match *rows* lazily, yielding flattened result rows.
+
+    Customers with a ``customer_id`` are referenced by it, others by their
+    0-based position. Malformed rows and per-customer ``ROW_ERRORS`` become
+    error rows; the stream carries on with the next customer.
+    """
+    for position, row in enumerate(rows):
+        ref_id = row.get("customer_id") if isinstance(row, dict) else None
+        ref = {"customer_id": ref_id} if ref_id not in (None, "") else {"row": position}
+        try:
+            if isinstance(row, ValueError):
+                raise row
+            matches = match(normalize_customer(row))
+        except ROW_ERRORS as exc:
+            yield from result_rows(ref, None, str(exc))
+            continue
+        yield from result_rows(ref, matches)
@@ -0,0 +1,228 @@
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from etl.jobs import JobStore, parse_customers_csv, parse_customers_ndjson, run_worker
+from etl.match_customer import rank_products
+from etl.tests.test_match_customer import make_customer as _make_customer, make_product
+
+
+def make_customer():
+    return dict(_make_customer(), requested_product_type="term_loan")
+
+
+def test_parse_uploads_normalizes_types():
+    rows = parse_customers_csv("state,dscr,cashflow_positive,industry\nCA,1.3,false,\n")
+    assert rows == [{"state": "CA", "dscr": 1.3, "cashflow_positive": False, "industry": None}]
+    rows = parse_customers_ndjson('{"state": "TX", "dscr": "2"}\n\n{"customer_id": 7}\n')
+    assert rows == [{"state": "TX", "dscr": 2.0}, {"customer_id": 7}]
+
+
+def test_job_is_chunked_processed_and_streamed_in_order(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    customers = [dict(make_customer(), row=i) for i in range(5)] + [{"customer_id": 42}]
+    job_id = store.submit(customers, top=3, chunk_size=2)
+    assert store.status(job_id)["status"] == "queued"
+    assert store.status(job_id)["total_chunks"] == 3
+
+    products = [make_product()]
+
+    def resolve(customer_id):
+        raise ValueError(f"Customer id {customer_id} not found")
+
+    assert run_worker(store, lambda c, top: rank_products(products, c, top), resolve, once=True) == 3
+
+    status = store.status(job_id)
+    assert status["status"] == "done"
+    assert status["processed_customers"] == 6
+    lines = [json.loads(line) for line in store.iter_results(job_id)]
+    assert [line.get("row") for line in lines[:5]] == [0, 1, 2, 3, 4]
+    assert lines[0]["matches"][0]["product_id"] == 1
+    assert lines[5] == {"customer_id": 42, "error": "Customer id 42 not found"}
+    assert store.status("missing") is None
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_is_ignored(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.db"), lease_seconds=0)
+    job_id = store.submit([make_customer()], chunk_size=10)
+    first = store.claim("dead-worker")
+    assert first["seq"] == 0
+    # The lease already expired, so another worker picks the chunk up again
+    second = store.claim("worker-2")
+    assert second["job_id"] == job_id
+
+    assert store.complete(job_id, 0, "worker-2", [{"row": 0, "matches": []}])
+    # The first worker wakes up late: it can neither fail nor overwrite the chunk
+    assert not store.fail(job_id, 0, "dead-worker", "RuntimeError: late")
+    assert not store.complete(job_id, 0, "dead-worker", [{"row": 0, "error": "late"}])
+    assert not store.heartbeat(job_id, 0, "dead-worker")
+    assert store.status(job_id)["status"] == "done"
+    assert [json.loads(line) for line in store.iter_results(job_id)] == [{"row": 0, "matches": []}]
+
+
+def test_worker_stops_when_its_chunk_is_taken_over(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.db"), lease_seconds=0)
+    job_id = store.submit([dict(make_customer(), row=i) for i in range(3)], chunk_size=10)
+    products = [make_product()]
+    calls = []
+
+    def match(customer, top):
+        if not calls:
+            # Worker A stalls past its lease; worker B reclaims and finishes the chunk
+            chunk = store.claim("worker-b")
+            store.complete(chunk["job_id"], chunk["seq"], "worker-b",
+                           [{"row": i, "matches": []} for i in range(3)])
+        calls.append(customer)
+        return rank_products(products, customer, top)
+
+    run_worker(store, match, lambda i: None, worker_id="worker-a", once=True)
+    assert len(calls) == 1  # A gave up at its next lease renewal
+    assert [json.loads(line)["matches"] for line in store.iter_results(job_id)] == [[], [], []]
+
+
+def test_failed_chunks_are_retried_then_reported_per_customer(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.db"), max_attempts=2)
+    flaky = store.submit([make_customer()])
+    broken = store.submit([dict(make_customer(), row=0), {"customer_id": 7}])
+    products = [make_product()]
+    calls = []
+
+    def match(customer, top):
+        calls.append(customer)
+        if len(calls) == 1 or customer.get("state") == "TX":
+            raise RuntimeError("boom")
+        return rank_products(products, customer, top)
+
+    def resolve(customer_id):
+        return dict(make_customer(), state="TX")
+
+    run_worker(store, match, resolve, once=True)
+    assert store.status(flaky)["status"] == "done" and store.status(flaky)["errors"] == []
+    assert json.loads(next(store.iter_results(flaky)))["matches"][0]["product_id"] == 1
+
+    status = store.status(broken)
+    assert status["status"] == "done"
+    assert (status["failed_chunks"], status["processed_customers"]) == (1, 2)
+    assert status["errors"] == ["RuntimeError: boom"]
+    assert [json.loads(line) for line in store.iter_results(broken)] == [
+        {"row": 0, "error": "RuntimeError: boom"},
+        {"customer_id": 7, "error": "RuntimeError: boom"},
+    ]
+
+
+class _FakeConnection:
+    """Mimics Postgres transaction semantics: a failed query aborts the
+    transaction until rollback, unless autocommit is on."""
+
+    def __init__(self):
+        self.autocommit = False
+        self.aborted = False
+        self.fail_next = False
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def rollback(self):
+        self.aborted = False
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        import psycopg2
+
+        if self.conn.aborted:
+            raise psycopg2.errors.InFailedSqlTransaction("current transaction is aborted")
+        if self.conn.fail_next:
+            self.conn.fail_next = False
+            self.conn.aborted = not self.conn.autocommit
+            raise psycopg2.OperationalError("statement timeout")
+        if "customer_profiles" in sql:
+            customer = make_customer()
+        else:
+            customer = make_product()
+        self.description = [(name,) for name in customer]
+        self._rows = [tuple(customer.values())]
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+def test_db_worker_recovers_after_failed_chunk(tmp_path: Path, monkeypatch):
+    import psycopg2
+
+    from etl.jobs import make_matcher
+
+    conn = _FakeConnection()
+    monkeypatch.setattr(psycopg2, "connect", lambda dsn: conn)
+    match, resolve = make_matcher(dsn="postgres://test")
+    store = JobStore(str(tmp_path / "jobs.db"), max_attempts=1)
+
+    failing = store.submit([{"customer_id": 1}])
+    conn.fail_next = True
+    run_worker(store, match, resolve, once=True)
+    assert store.status(failing)["failed_chunks"] == 1
+
+    ok = store.submit([{"customer_id": 1}])
+    run_worker(store, match, resolve, once=True)
+    assert store.status(ok)["status"] == "done"
+    assert json.loads(next(store.iter_results(ok)))["matches"][0]["product_id"] == 1
+
+
+def test_snapshot_matcher_serves_repeated_profiles_from_cache(tmp_path: Path, monkeypatch):
+    import etl.snapshot
+    from etl.jobs import make_matcher
+
+    path = str(tmp_path / "catalog.snap")
+    etl.snapshot.write_snapshot([dict(make_product(), product_type="term_loan")], path, catalog_version=1)
+    calls = []
+    rank_catalog = etl.snapshot.rank_catalog
+    monkeypatch.setattr(etl.snapshot, "rank_catalog",
+                        lambda *a: calls.append(a) or rank_catalog(*a))
+    match, _ = make_matcher(snapshot=path)
+
+    first = match(make_customer(), 5)
+    first[0]["score"] = -1  # callers get copies
+    assert match(make_customer(), 5)[0]["product_id"] == 1
+    assert match(make_customer(), 5)[0]["score"] != -1
+    assert len(calls) == 1
+    assert match(dict(make_customer(), state="NV"), 5) == []  # excluded state
+    assert len(calls) == 2
+
+
+def test_rows_without_product_type_are_rejected(tmp_path: Path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.submit([dict(make_customer(), requested_product_type=None)])
+    products = [make_product()]
+    run_worker(store, lambda c, top: rank_products(products, c, top), lambda i: None, once=True)
+    assert [json.loads(line) for line in store.iter_results(job_id)] == [
+        {"row": 0, "error": "requested_product_type is required"}
+    ]
+
+
+def test_results_can_be_read_from_several_threads(tmp_path: Path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.submit([dict(make_customer(), row=i) for i in range(3)], chunk_size=1)
+    products = [make_product()]
+    run_worker(store, lambda c, top: rank_products(products, c, top), lambda i: None, once=True)
+
+    lines = store.iter_results(job_id)
+    # Like StreamingResponse, advance the generator on a different thread each time
+    with ThreadPoolExecutor(max_workers=1) as a, ThreadPoolExecutor(max_workers=1) as b:
+        got = [pool.submit(next, lines).result() for pool in (a, b, a)]
+    assert [json.loads(line)["row"] for line in got] == [0, 1, 2]
@@ -0,0 +1,57 @@
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from etl.match_cache import MatchCache, cache_key
+from etl.tests.test_match_customer import make_customer
+
+
+def test_cache_key_normalizes_and_tracks_catalog_version():
+    customer = make_customer()
+    from_db = dict(customer, dscr=Decimal("1.3"), legal_name="ignored")
+    assert cache_key(customer, 1, 5) == cache_key(from_db, 1, 5)
+    # The gates compare strings raw, so " CA" must not share a key with "CA"
+    assert cache_key(customer, 1, 5) != cache_key(dict(customer, state=" CA"), 1, 5)
+    assert cache_key(customer, 1, 5) != cache_key(customer, 2, 5)
+    assert cache_key(customer, 1, 5) != cache_key(dict(customer, requested_amount_usd=1), 1, 5)
+
+
+def test_memory_tier_lru_and_ttl():
+    now = [0.0]
+    cache = MatchCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1, [{"product_id": 1}])
+    cache.put("b", 1, [])
+    assert cache.get("a", 1) == [{"product_id": 1}]
+    cache.put("c", 1, [])  # evicts least recently used "b"
+    assert cache.get("b", 1) is None
+    now[0] = 11.0
+    assert cache.get("a", 1) is None
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 2, "size": 1}
+
+
+def test_disk_tier_shared_and_invalidated_by_version(tmp_path: Path):
+    path = str(tmp_path / "cache.db")
+    first = MatchCache(path=path)
+    first.put("k", 1, [{"min_amount": Decimal("50000")}])
+    first.close()
+
+    second = MatchCache(path=path)
+    assert second.get("k", 1) == [{"min_amount": 50000.0}]
+    assert second.stats()["disk_hits"] == 1
+    third = MatchCache(path=path)
+    assert third.get("k", 2) is None
+    assert third.get("k", 1) is None  # purged once version 2 was seen
+
+
+def test_disk_tier_prunes_expired_rows_and_hits_are_copies(tmp_path: Path):
+    cache = MatchCache(ttl=60, path=str(tmp_path / "cache.db"))
+    cache.put("old", 1, [{"product_id": 1}])
+    cache._disk.execute("UPDATE match_cache SET created_at = created_at - 120")
+    cache.put("new", 1, [{"product_id": 2}])
+    assert [r[0] for r in cache._disk.execute("SELECT key FROM match_cache")] == ["new"]
+
+    cache.get("new", 1)[0]["product_id"] = 99
+    assert cache.get("new", 1) == [{"product_id": 2}]
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from etl.catalog import ColumnarCatalog
+from etl.match_customer import passes_deal, passes_eligibility, passes_underwriting
+from etl.near_miss import analyze, evaluate_gates
+from etl.tests.test_match_customer import make_customer, make_product
+
+
+def test_near_miss_reports_every_failing_gate_with_gap():
+    product = make_product()
+    customer = make_customer()
+    customer["personal_credit_score"] = 650
+    customer["requested_amount_usd"] = 300000
+    customer["requested_product_type"] = "term_loan"
+
+    report = analyze([product], customer, max_failed=2)
+    assert report["matched"] == 0
+    (nm,) = report["near_misses"]
+    gaps = {g["gate"]: g["gap"] for g in nm["failed_gates"]}
+    assert gaps == {"personal_credit_score": 30.0, "amount_max": 50000.0}
+
+
+def test_gates_agree_with_row_filters():
+    passing = make_product()
+    blocked_state = dict(make_product(), id=2, geographic_footprint=None, bank_footprint="NY")
+    relationship = dict(make_product(), id=3, requires_existing_relationship=True)
+    no_limits = {"id": 4, "bank_name": "Open Bank"}
+    products = [passing, blocked_state, relationship, no_limits]
+    customer = make_customer()
+
+    failed, _ = evaluate_gates(ColumnarCatalog.from_products(products), customer)
+    for i, p in enumerate(products):
+        expected = all(
+            f(p, customer)[0] for f in (passes_eligibility, passes_underwriting, passes_deal)
+        )
+        assert (not failed[:, i].any()) == expected
+
+
+def test_blocker_summary_counts_sole_blockers():
+    products = [
+        dict(make_product(), id=i, min_dscr=dscr) for i, dscr in enumerate([1.2, 1.5, 1.4])
+    ]
+    report = analyze(products, make_customer())
+    (dscr,) = report["blockers"]
+    assert dscr["gate"] == "dscr" and dscr["sole_blocker"] == 2
+    assert dscr["min_gap_to_unlock"] == 0.1
@@ -0,0 +1,133 @@
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from benchmarks.synthetic import generate_customers, generate_products
+from etl.catalog import ColumnarCatalog
+from etl.match_customer import (
+    compute_score,
+    match_products,
+    passes_deal,
+    passes_eligibility,
+    passes_underwriting,
+    rank_products,
+)
+from etl.near_miss import evaluate_gates
+from etl.records import CustomerProfile, ProductCriteria, fetch_product_criteria
+from etl.tests.test_match_customer import make_customer, make_product
+
+
+def test_records_are_preconverted():
+    product = ProductCriteria.from_row(dict(make_product(), min_dscr=Decimal("1.2")))
+    assert product.min_dscr == 1.2 and isinstance(product.min_dscr, float)
+    assert product.allowed_entities == frozenset({"LLC", "S-Corp"})
+    assert product["bank_name"] == "Sample Bank"
+    assert product.get("bank_footprint") is None
+    assert not hasattr(product, "__dict__")
+
+    customer = CustomerProfile(**dict(make_customer(), business_credit_score=None))
+    assert customer.get("business_credit_score", 0) == 0
+    assert customer.personal_credit_score == 700.0
+
+
+def test_filters_accept_records():
+    for f in (passes_eligibility, passes_underwriting, passes_deal):
+        for product, customer in [
+            (make_product(), make_customer()),
+            (dict(make_product(), geographic_footprint="NY"), make_customer()),
+            (make_product(), dict(make_customer(), dscr=1.0, requested_amount_usd=10)),
+        ]:
+            expected = f(product, customer)
+            got = f(ProductCriteria.from_row(product), CustomerProfile(**customer))
+            assert got == expected
+    assert compute_score(ProductCriteria.from_row(make_product()), CustomerProfile(**make_customer())) == \
+        compute_score(make_product(), make_customer())
+
+
+def test_rank_and_columnar_agree_for_records():
+    rows = generate_products(200, seed=5)
+    records = [ProductCriteria.from_row(r) for r in rows]
+    for customer in generate_customers(10, seed=5):
+        profile = CustomerProfile(**customer)
+        assert rank_products(records, profile, 20) == [
+            dict(r, min_amount=float(r["min_amount"]), max_amount=float(r["max_amount"]))
+            for r in rank_products(rows, customer, 20)
+        ]
+        assert (evaluate_gates(ColumnarCatalog.from_products(records), profile)[0] ==
+                evaluate_gates(ColumnarCatalog.from_products(rows), customer)[0]).all()
+
+
+def test_missing_product_type_matches_nothing():
+    class NoQueries:
+        def cursor(self):
+            raise AssertionError("no query expected")
+
+    customer = CustomerProfile(**dict(make_customer(), requested_product_type=None))
+    assert match_products(NoQueries(), customer, 5) == []
+    with pytest.raises(ValueError):
+        fetch_product_criteria(NoQueries(), None)
+
+
+class _RowsConnection:
+    """DB-API stand-in answering each query with canned rows by table name."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.queries = []
+
+    def cursor(self):
+        return _RowsCursor(self)
+
+
+class _RowsCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        self.conn.queries.append(sql)
+        table = next(t for t in self.conn.tables if t in sql)
+        names, self._rows = self.conn.tables[table]
+        self.description = [(n,) for n in names]
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+def test_display_fields_are_loaded_for_shown_products_only():
+    from etl.match_customer import add_display_fields, fetch_customer, fetch_products
+    from etl.records import PRODUCT_DISPLAY_FIELDS, load_display_fields
+
+    product = dict(make_product(), product_type="term_loan")
+    collateral = dict.fromkeys(PRODUCT_DISPLAY_FIELDS)
+    collateral.update(max_ltv_real_estate=Decimal("80"), special_conditions="Deposit relationship")
+    conn = _RowsConnection({
+        "FROM products": (list(product), [tuple(product.values())]),
+        "FROM product_collateral": (["product_id"] + list(collateral), [(1, *collateral.values())]),
+        "customer_profiles": (list(make_customer()), [tuple(make_customer().values())]),
+    })
+
+    fields = load_display_fields(conn, [1, 2, 1])
+    assert fields[1]["max_ltv_real_estate"] == 80.0 and fields[1]["special_conditions"] == "Deposit relationship"
+    assert fields[2] == dict.fromkeys(PRODUCT_DISPLAY_FIELDS)
+    assert load_display_fields(conn, []) == {} and len(conn.queries) == 1
+
+    matches = add_display_fields(conn, [{"product_id": 1, "score": 0.5}])
+    assert matches[0]["special_conditions"] == "Deposit relationship"
+
+    rows = fetch_products(conn, "term_loan")
+    assert rows[0]["id"] == 1 and rows[0]["special_conditions"] == "Deposit relationship"
+    assert "display" not in rows[0]
+    assert fetch_customer(conn, 1)["state"] == make_customer()["state"]
@@ -0,0 +1,92 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+import pytest
+
+from benchmarks.synthetic import generate_customers, generate_products
+from etl.match_customer import rank_products
+from etl.snapshot import open_snapshot, rank_catalog, write_snapshot
+
+
+def test_snapshot_round_trip_matches_row_matcher(tmp_path: Path):
+    products = generate_products(300, seed=3)
+    path = str(tmp_path / "catalog.snap")
+    assert write_snapshot(products, path, catalog_version=7) == 300
+
+    with open_snapshot(path) as snap:
+        assert snap.catalog_version == 7
+        assert sum(e - s for s, e in snap.product_types.values()) == 300
+        for customer in generate_customers(25, seed=3):
+            ptype = customer["requested_product_type"]
+            expected = rank_products([p for p in products if p["product_type"] == ptype], customer, 1000)
+            got = rank_catalog(snap.catalog(ptype), customer, 1000)
+            assert sorted((r["product_id"], r["score"]) for r in got) == \
+                sorted((r["product_id"], r["score"]) for r in expected)
+            assert [r["score"] for r in got] == sorted((r["score"] for r in got), reverse=True)
+
+
+def test_snapshot_without_product_type_matches_nothing(tmp_path: Path):
+    from etl.near_miss import analyze_catalog
+
+    path = str(tmp_path / "catalog.snap")
+    write_snapshot(generate_products(50, seed=1), path)
+    customer = dict(generate_customers(1, seed=1)[0], requested_product_type=None)
+    with open_snapshot(path) as snap:
+        assert len(snap.catalog_all()) == 50
+        assert len(snap.catalog(None)) == 0
+        assert rank_catalog(snap.catalog(None), customer, 10) == []
+        assert analyze_catalog(snap.catalog(None), customer)["products"] == 0
+
+
+def test_snapshot_rejects_foreign_files(tmp_path: Path):
+    bogus = tmp_path / "bogus.snap"
+    bogus.write_bytes(b"not a snapshot" + b"\0" * 64)
+    with pytest.raises(ValueError):
+        open_snapshot(str(bogus))
+
+
+class _RecordingConnection:
+    """Minimal DB-API stand-in recording the statements it runs."""
+
+    autocommit = True
+
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            description = [("id",), ("product_type",)]
+
+            def execute(self, sql, params=None):
+                conn.log.append(" ".join(sql.split()))
+
+            def fetchone(self):
+                return (4,)
+
+            def fetchall(self):
+                return [(1, "term_loan")]
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+    def rollback(self):
+        self.log.append("ROLLBACK")
+
+
+def test_export_reads_version_and_products_in_one_snapshot(tmp_path: Path):
+    from etl.snapshot import export_snapshot
+
+    conn = _RecordingConnection()
+    assert export_snapshot(conn, str(tmp_path / "c.snap")) == 1
+    assert conn.log[0] == "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"
+    assert conn.log[1].startswith("SELECT version FROM catalog_version")
+    assert conn.log[-1] == "ROLLBACK" and conn.autocommit is True
+    with open_snapshot(str(tmp_path / "c.snap")) as snap:
+        assert snap.catalog_version == 4
@@ -0,0 +1,98 @@
+import csv
+import io
+import json
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+
+from etl.match_customer import rank_products
+from etl.streaming import (
+    ROW_FIELDS,
+    encode,
+    iter_customer_rows,
+    rows_from_ndjson,
+    stream_matches,
+    write_stream,
+)
+from etl.tests.test_match_customer import make_customer, make_product
+
+
+def test_encoders_round_trip():
+    rows = [{"a": 1, "b": Decimal("2.5")}, {"a": 2, "b": None}]
+    assert [json.loads(line) for line in encode(rows, "ndjson")] == [{"a": 1, "b": 2.5}, {"a": 2, "b": None}]
+    assert json.loads("".join(encode(rows, "json"))) == [{"a": 1, "b": 2.5}, {"a": 2, "b": None}]
+    assert json.loads("".join(encode([], "json"))) == []
+    assert "".join(encode(rows, "csv")) == "a,b\n1,2.5\n2,\n"
+    assert "".join(encode([], "csv", ["a", "b"])) == "a,b\n"
+
+
+def test_stream_matches_is_lazy_and_flattens_rows(tmp_path: Path):
+    path = tmp_path / "customers.csv"
+    customer = make_customer()
+    with path.open("w", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=list(customer) + ["customer_id"])
+        writer.writeheader()
+        writer.writerow(customer)
+        writer.writerow(dict(customer, customer_id=9))
+
+    products = [make_product()]
+    seen = []
+
+    def match(c):
+        seen.append(c)
+        if c.get("customer_id") is not None:
+            raise ValueError("not found")
+        return rank_products(products, c, 5)
+
+    rows = stream_matches(iter_customer_rows(str(path)), match)
+    first = next(rows)
+    assert len(seen) == 1  # the second customer is not read yet
+    assert first["row"] == 0 and first["rank"] == 1 and first["product_id"] == 1
+    assert list(rows) == [{"customer_id": "9", "error": "not found"}]
+
+    out = io.StringIO()
+    write_stream(encode([first], "csv", ROW_FIELDS), out)
+    assert out.getvalue().splitlines()[0] == ",".join(ROW_FIELDS)
+
+
+def test_rows_from_job_results():
+    lines = ['{"row": 0, "matches": [{"product_id": 1}, {"product_id": 2}]}\n',
+             '{"customer_id": 5, "error": "missing"}\n',
+             '{"row": 2, "matches": []}\n']
+    assert list(rows_from_ndjson(lines)) == [
+        {"row": 0, "rank": 1, "product_id": 1},
+        {"row": 0, "rank": 2, "product_id": 2},
+        {"customer_id": 5, "error": "missing"},
+        {"row": 2},
+    ]
+
+
+def test_malformed_rows_become_error_rows(tmp_path: Path):
+    path = tmp_path / "customers.ndjson"
+    good = make_customer()
+    path.write_text("\n".join([
+        json.dumps(dict(good, years_in_business="x")),
+        "{not json",
+        "[1, 2]",
+        json.dumps(good),
+        json.dumps({"customer_id": [1]}),
+        json.dumps(dict(good, state="NV")),
+    ]) + "\n")
+    products = [make_product()]
+
+    def match(customer):
+        if customer.get("customer_id") is not None:
+            int(customer["customer_id"])  # TypeError for a list, as match_customer's lookup
+        return rank_products(products, customer, 5)
+
+    rows = list(stream_matches(iter_customer_rows(str(path)), match))
+    assert [r.get("error", "").split(":")[0] for r in rows[:3]] == [
+        "Invalid number for years_in_business", "Invalid JSON on line 2", "Line 3 is not an object",
+    ]
+    assert [r["row"] for r in rows[:4]] == [0, 1, 2, 3]
+    assert rows[3]["product_id"] == 1
+    assert rows[4]["customer_id"] == [1] and "int()" in rows[4]["error"]
+    assert rows[5] == {"row": 5}  # no match (excluded state) still yields a row
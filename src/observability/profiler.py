@@ -0,0 +1,183 @@
+"""Opt-in timing and counter instrumentation.
+
+Code paths wrap their work in :func:`stage` and report gate throughput with
+:func:`rows` and :func:`failure`. Until :func:`enable` installs a
+:class:`Profiler` these helpers return immediately (one global lookup), so
+instrumented code runs at full speed when profiling is off.
+
+Example:
+    from src.observability import profiler
+
+    prof = profiler.enable()
+    matches = match_products(conn, customer, 10)
+    print(prof.summary())
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _StageTimer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopTimer()
+
+
+class Profiler:
+    """Accumulates per-stage wall time, gate row counts and failed checks.
+
+    Attributes:
+        stages: ``name -> [calls, seconds]``.
+        gate_rows: ``gate -> [rows_in, rows_out]``.
+        failures: Counter of ``(gate, check)`` pairs. ``check`` must be a
+            stable name (never customer data) as it becomes a metrics label.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, List[float]] = {}
+        self.gate_rows: Dict[str, List[int]] = {}
+        self.failures: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> _StageTimer:
+        return _StageTimer(self, name)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_rows(self, gate: str, rows_in: int, rows_out: int) -> None:
+        with self._lock:
+            entry = self.gate_rows.setdefault(gate, [0, 0])
+            entry[0] += rows_in
+            entry[1] += rows_out
+
+    def add_failure(self, gate: str, check: str, count: int = 1) -> None:
+        with self._lock:
+            self.failures[(gate, check)] += count
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages.clear()
+            self.gate_rows.clear()
+            self.failures.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "stages": {k: {"calls": int(c), "seconds": round(s, 6)} for k, (c, s) in self.stages.items()},
+                "gates": {k: {"rows_in": i, "rows_out": o} for k, (i, o) in self.gate_rows.items()},
+                "failures": [
+                    {"gate": g, "check": c, "count": n} for (g, c), n in self.failures.most_common()
+                ],
+            }
+
+    def summary(self, top_reasons: int = 10) -> str:
+        """Return a human-readable report for ``--profile`` output."""
+        data = self.to_dict()
+        lines = [f"{'Stage':32} {'Calls':>7} {'Seconds':>10}"]
+        for name, s in sorted(data["stages"].items(), key=lambda kv: -kv[1]["seconds"]):
+            lines.append(f"{name:32} {s['calls']:>7} {s['seconds']:>10.4f}")
+        if data["gates"]:
+            lines.append(f"{'Gate':32} {'In':>7} {'Out':>10}")
+            for name, g in data["gates"].items():
+                lines.append(f"{name:32} {g['rows_in']:>7} {g['rows_out']:>10}")
+        if data["failures"]:
+            lines.append("Top failed checks:")
+            for f in data["failures"][:top_reasons]:
+                lines.append(f"  {f['count']:>7}  {f['gate']}: {f['check']}")
+        return "\n".join(lines)
+
+    def render_prometheus(self, prefix: str = "bankmatch") -> str:
+        """Return the counters in the Prometheus text exposition format."""
+        data = self.to_dict()
+        out: List[str] = []
+
+        def metric(name: str, help_text: str, samples: List[Tuple[Dict[str, str], float]]) -> None:
+            out.append(f"# HELP {prefix}_{name} {help_text}")
+            out.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                out.append(f"{prefix}_{name}{{{label_str}}} {value}")
+
+        stages = data["stages"].items()
+        metric("stage_seconds_total", "Wall time spent per stage.",
+               [({"stage": k}, v["seconds"]) for k, v in stages])
+        metric("stage_calls_total", "Number of times each stage ran.",
+               [({"stage": k}, v["calls"]) for k, v in stages])
+        gates = data["gates"].items()
+        metric("gate_rows_in_total", "Rows entering each gate.",
+               [({"gate": k}, v["rows_in"]) for k, v in gates])
+        metric("gate_rows_out_total", "Rows surviving each gate.",
+               [({"gate": k}, v["rows_out"]) for k, v in gates])
+        metric("gate_failures_total", "Rows rejected per gate and check.",
+               [({"gate": f["gate"], "check": f["check"]}, f["count"]) for f in data["failures"]])
+        return "\n".join(out) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_active: Optional[Profiler] = None
+
+
+def enable(profiler: Optional[Profiler] = None) -> Profiler:
+    """Install *profiler* (or a new one) as the process-wide profiler."""
+    global _active
+    _active = profiler or Profiler()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def current() -> Optional[Profiler]:
+    return _active
+
+
+def stage(name: str):
+    """Context manager timing *name*; a shared no-op when disabled."""
+    prof = _active
+    return _NOOP if prof is None else prof.stage(name)
+
+
+def rows(gate: str, rows_in: int, rows_out: int) -> None:
+    prof = _active
+    if prof is not None:
+        prof.add_rows(gate, rows_in, rows_out)
+
+
+def failure(gate: str, check: str) -> None:
+    prof = _active
+    if prof is not None:
+        prof.add_failure(gate, check)
@@ -8,6 +8,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List
 
+from src.observability import profiler
+
 # Supported comparison operators
 OPERATORS: Dict[str, Callable[[float, float], bool]] = {
     ">=" : lambda a, b: a >= b,
@@ -51,6 +53,18 @@ class RulesEngine:
 
     def evaluate(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """Return evaluation result with approval flag and score."""
+        prof = profiler.current()
+        if prof is None:
+            return self._evaluate(metrics)
+        with prof.stage("rules.evaluate"):
+            result = self._evaluate(metrics)
+        # Label by rule field; reasons also carry the customer's value
+        for reason in result["reasons"]:
+            prof.add_failure("rules", reason.split(" ", 1)[0])
+        prof.add_rows("rules", 1, int(result["approved"]))
+        return result
+
+    def _evaluate(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         score = 0.0
         reasons: List[str] = []
         for rule in self.rules:
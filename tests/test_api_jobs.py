@@ -0,0 +1,46 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient
+
+from etl.jobs import JobStore, run_worker
+from etl.match_customer import rank_products
+from etl.tests.test_match_customer import make_customer, make_product
+
+
+def load_api(monkeypatch, jobs_db: Path):
+    monkeypatch.setenv("BANKMATCH_JOBS_DB", str(jobs_db))
+    monkeypatch.delenv("BANKMATCH_JOB_WORKERS", raising=False)
+    spec = importlib.util.spec_from_file_location("bankmatch_api", ROOT / "apps" / "api" / "src" / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_job_results_stream_every_chunk(tmp_path: Path, monkeypatch):
+    api = load_api(monkeypatch, tmp_path / "jobs.db")
+    client = TestClient(api.app)
+    customers = [dict(make_customer(), requested_product_type="term_loan") for _ in range(7)]
+    response = client.post("/jobs/match?top=3&chunk_size=2", json={"customers": customers})
+    assert response.status_code == 202
+    job = response.json()
+
+    products = [make_product()]
+    store = JobStore(str(tmp_path / "jobs.db"))
+    assert run_worker(store, lambda c, top: rank_products(products, c, top), lambda i: None, once=True) == 4
+    assert client.get(job["status_url"]).json()["status"] == "done"
+
+    # Starlette advances the results generator on threadpool threads, one
+    # chunk at a time
+    lines = client.get(job["results_url"]).text.splitlines()
+    assert [json.loads(line)["row"] for line in lines] == list(range(7))
+    rows = client.get(job["results_url"] + "?format=csv").text.splitlines()
+    assert rows[0].startswith("customer_id,row,rank") and len(rows) == 8
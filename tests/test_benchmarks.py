@@ -0,0 +1,32 @@
+from benchmarks import synthetic
+from benchmarks.run import IMPORT_BUDGETS_MS, check_imports, compare, measure_import, run_suite
+
+
+def test_synthetic_generation_is_seeded():
+    assert synthetic.generate_products(20, seed=7) == synthetic.generate_products(20, seed=7)
+    assert synthetic.generate_customers(20, seed=7) != synthetic.generate_customers(20, seed=8)
+    fico = [c["personal_credit_score"] for c in synthetic.generate_customers(500)]
+    assert 300 <= min(fico) and max(fico) <= 850
+
+
+def test_run_suite_smoke_and_compare():
+    report = run_suite([50], customers=100, match_customers=3, repeat=1, bulk_customers=100)
+    names = {r["name"] for r in report["results"]}
+    assert {"startup.import", "match.rank_products", "match.bulk_snapshot",
+            "rules_engine.evaluate", "convert_json_to_csv"} <= names
+    slower = {"results": [dict(r, us_per_op=r["us_per_op"] * 2) for r in report["results"]]}
+    assert compare(report, report, tolerance=0.2) == []
+    assert compare(slower, report, tolerance=0.2)
+
+
+def test_entry_points_do_not_import_heavy_dependencies():
+    # Only the deterministic part; time budgets are enforced by benchmarks.run
+    for module in IMPORT_BUDGETS_MS:
+        assert measure_import(module)[1] == [], module
+
+
+def test_import_check_flags_heavy_dependencies():
+    assert measure_import("etl.match_customer")[0] > 0
+    assert measure_import("etl.near_miss")[1] == ["numpy"]
+    violations = check_imports([], {"etl.records": 0.0}, repeat=1)
+    assert violations and "budget" in violations[0]
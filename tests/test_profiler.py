@@ -0,0 +1,62 @@
+from benchmarks import synthetic
+from etl.catalog import ColumnarCatalog
+from etl.match_customer import rank_products
+from etl.snapshot import rank_catalog
+from etl.tests.test_match_customer import make_customer, make_product
+from src.observability import profiler
+from src.scoring.rules_engine import Rule, RulesEngine
+
+
+def test_disabled_profiler_is_a_noop():
+    profiler.disable()
+    with profiler.stage("anything"):
+        pass
+    profiler.rows("gate", 1, 0)
+    assert profiler.current() is None
+
+
+def test_profiler_records_gates_reasons_and_exposition():
+    prof = profiler.enable()
+    try:
+        products = [make_product(), dict(make_product(), id=2, min_dscr=2.0)]
+        assert len(rank_products(products, make_customer(), 5)) == 1
+        RulesEngine([Rule("fico", ">=", 700)]).evaluate({"fico": 650})
+    finally:
+        profiler.disable()
+
+    data = prof.to_dict()
+    assert data["gates"]["eligibility"] == {"rows_in": 2, "rows_out": 2}
+    assert data["gates"]["underwriting"] == {"rows_in": 2, "rows_out": 1}
+    assert {"gate": "underwriting", "check": "dscr", "count": 1} in data["failures"]
+    assert data["stages"]["scoring"]["calls"] == 1
+    assert data["stages"]["rules.evaluate"]["calls"] == 1
+
+    text = prof.render_prometheus()
+    assert 'bankmatch_gate_rows_out_total{gate="underwriting"} 1' in text
+    assert 'bankmatch_gate_failures_total{gate="rules",check="fico"} 1' in text
+
+
+def test_failure_labels_exclude_customer_values_and_snapshot_counts_match():
+    products = synthetic.generate_products(300, seed=3)
+    customers = synthetic.generate_customers(20, seed=3)
+    by_type = {}
+    for p in products:
+        by_type.setdefault(p["product_type"], []).append(p)
+    catalogs = {t: ColumnarCatalog.from_products(ps) for t, ps in by_type.items()}
+
+    counters = []
+    for rank in (lambda c: rank_products(by_type[c["requested_product_type"]], c, 5),
+                 lambda c: rank_catalog(catalogs[c["requested_product_type"]], c, 5)):
+        prof = profiler.enable()
+        try:
+            for c in customers:
+                rank(c)
+        finally:
+            profiler.disable()
+        data = prof.to_dict()
+        counters.append((data["gates"], sorted((f["gate"], f["check"], f["count"]) for f in data["failures"])))
+
+    assert counters[0] == counters[1]
+    checks = {check for _, check, _ in counters[0][1]}
+    values = {str(c[f]) for c in customers for f in ("state", "industry", "use_of_proceeds")}
+    assert checks and not checks & values and not any(" " in check for check in checks)